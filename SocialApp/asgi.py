@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SocialApp.settings')
 
 application = get_asgi_application()
+
+# Build the follow graph before the first request, and rebuild it in the
+# background from here on.
+from core.graph import follow_graph  # noqa: E402
+
+follow_graph.start()
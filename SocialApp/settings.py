@@ -70,6 +70,8 @@ INSTALLED_APPS = [
 #     'USER_ID_CLAIM': 'user_id',
 # }
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,6 +79,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'SocialApp.urls'
@@ -110,6 +113,22 @@ DATABASES = {
     }
 }
 
+# Opt-in SQLite production profile: WAL and tuned pragmas on every
+# connection, persistent connections and BEGIN IMMEDIATE for atomic()
+# blocks. See SocialApp/sqlite/base.py and the README.
+if os.getenv("SQLITE_PRODUCTION_PROFILE", "false").lower() == "true":
+    DATABASES['default'].update({
+        'ENGINE': 'SocialApp.sqlite',
+        'CONN_MAX_AGE': int(os.getenv("SQLITE_CONN_MAX_AGE", 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'busy_timeout': int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+            },
+        },
+    })
+
 # DATABASES = {
 #     "default": {
 #         "ENGINE": "django.db.backends.postgresql",
@@ -123,6 +142,89 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'authentication.User'
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered post detail responses, see core.cache.PostCache.
+    'posts': {
+        'BACKEND': 'core.cache.CountingLocMemCache',
+        'LOCATION': 'posts',
+        'TIMEOUT': int(os.getenv("POST_CACHE_TIMEOUT", 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("POST_CACHE_MAX_ENTRIES", 10000)),
+        },
+    },
+    # Users loaded by JWT authentication, see authentication.backends.
+    'users': {
+        'BACKEND': 'core.cache.CountingLocMemCache',
+        'LOCATION': 'users',
+        'TIMEOUT': int(os.getenv("USER_CACHE_TIMEOUT", 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000)),
+        },
+    },
+    # COUNT(*) results of list totals, see core.counts.
+    'counts': {
+        'BACKEND': 'core.cache.CountingLocMemCache',
+        'LOCATION': 'counts',
+    },
+}
+
+# Seconds a cached list total may lag behind the table.
+COUNT_CACHE_TIMEOUT = int(os.getenv("COUNT_CACHE_TIMEOUT", 60))
+
+POST_CACHE_ENABLED = os.getenv("POST_CACHE_ENABLED", "true").lower() == "true"
+
+# Per-request query counts and timings, see core.middleware.
+SQL_INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv("SQL_INSTRUMENTATION_SAMPLE_RATE", 0.1)
+)
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", 10))
+
+# Share of requests to profile per URL name, "*" for the rest, e.g.
+# "postlist=0.1,postget=0.05,*=0.001". Empty (the default) disables
+# profiling. See core.profiling and `manage.py profile_report`.
+PROFILE_SAMPLE_RATES = {
+    name: float(rate)
+    for name, rate in (
+        item.split("=")
+        for item in os.getenv("PROFILE_SAMPLE_RATES", "").split(",")
+        if item
+    )
+}
+PROFILE_DIR = os.getenv("PROFILE_DIR", BASE_DIR / "profiles")
+PROFILE_FLUSH_INTERVAL = float(os.getenv("PROFILE_FLUSH_INTERVAL", 10))
+
+# Rows per piece of a ?stream=json|ndjson student list, see
+# core.streaming.
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 1000))
+
+# Rows per piece of a user data export and its zlib level (1-9), see
+# core.export.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", 1))
+
+# Records written per transaction by import_roster, see core.roster.
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 5000))
+
+# Prometheus metrics served at /metrics/, see core.metrics. With several
+# worker processes set METRICS_MODE=file so every process writes its
+# metrics to METRICS_DIR and each scrape sums them; empty the directory
+# when the deployment restarts.
+METRICS_MODE = os.getenv("METRICS_MODE", "memory")
+METRICS_DIR = os.getenv("METRICS_DIR", BASE_DIR / "metrics")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1))
+# Scrapers send "Authorization: Bearer <token>". Without a token only
+# METRICS_ALLOWED_IPS may scrape.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS",
+                                "127.0.0.1,::1").split(",")
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -145,6 +247,22 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'authentication.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Changing this rehashes each password on its owner's next login.
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 600000))
+# Threads hashing passwords for the async login/signup views, and how many
+# hashes may be queued before new requests get 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -172,14 +290,23 @@ REST_FRAMEWORK = {
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
 
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.CachedJWTAuthentication',
     ),
 
     'DEFAULT_PAGINATION_CLASS':
-    'rest_framework.pagination.LimitOffsetPagination'
+    'core.CustomPagination.KeysetPagination',
+
+    'DEFAULT_RENDERER_CLASSES': (
+        'authentication.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER":
+    "authentication.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER":
+    "authentication.serializers.TokenRefreshSerializer",
 }
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SocialApp.settings')
 
 application = get_wsgi_application()
+
+# Build the follow graph before the first request, and rebuild it in the
+# background from here on.
+from core.graph import follow_graph  # noqa: E402
+
+follow_graph.start()
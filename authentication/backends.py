@@ -0,0 +1,106 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE = "users"
+
+# The columns loaded and cached for request.user. The rest, notably the
+# followers/following/posts counters that bump() and bulk writes update
+# without any signal, stay deferred: reading them queries the current row.
+AUTH_FIELDS = (
+    "id", "password", "last_login", "email", "first_name", "last_name",
+    "gender", "is_active", "is_admin",
+)
+
+
+def user_cache_key(user_id):
+    return f"user:{user_id}"
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps the user for each user_id claim in the
+    "users" cache for a short TTL instead of loading it on every request.
+    Entries are dropped by authentication.signals when the User is saved
+    or deleted, in the process that saved it.
+
+    Only AUTH_FIELDS are cached. A change to them made without a signal
+    (queryset.update(), bulk writes) or in another process is seen after
+    at most the cache TIMEOUT (USER_CACHE_TIMEOUT, 60 seconds); that
+    includes deactivating a user with update().
+    """
+
+    def get_cached_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return None
+        user = caches[USER_CACHE].get(user_cache_key(user_id))
+        if user is not None and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"),
+                                       code="user_inactive")
+        return user
+
+    def cache_user(self, validated_token, user):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            caches[USER_CACHE].set(user_cache_key(user_id), user)
+
+    def load_user(self, validated_token):
+        """JWTAuthentication.get_user() loading only AUTH_FIELDS."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+        user = self.user_model.objects.only(*AUTH_FIELDS).filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"),
+                                       code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"),
+                                       code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code="password_changed",
+            )
+        return user
+
+    def get_user(self, validated_token):
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = self.load_user(validated_token)
+            self.cache_user(validated_token, user)
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views. Token validation is pure CPU and
+        the "users" cache is in-process, so only a cache miss leaves the
+        event loop.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = await sync_to_async(self.load_user)(validated_token)
+            self.cache_user(validated_token, user)
+        return user, validated_token
@@ -0,0 +1,100 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+# Seconds between pulls of newly blacklisted rows written by other
+# processes. 0 syncs before every check.
+SYNC_INTERVAL = getattr(settings, "TOKEN_BLACKLIST_SYNC_INTERVAL", 1)
+# Ids below the highest one synced that every sync reads again. On
+# PostgreSQL and MySQL a row may commit after rows with higher ids; it is
+# picked up as long as fewer than this many ids were handed out after its
+# own before it committed. SQLite commits in id order.
+RESCAN_IDS = getattr(settings, "TOKEN_BLACKLIST_RESCAN_IDS", 100)
+FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 10000
+
+
+class BlacklistFilter:
+    """
+    Bloom filter over the JTIs in the BlacklistedToken table.
+
+    might_contain() never returns False for a blacklisted JTI that has
+    been synced, so a negative answer lets the caller skip the blacklist
+    query; a positive answer still has to be confirmed against the table.
+    New rows are pulled incrementally by id, rereading the last RESCAN_IDS
+    ids for rows that committed out of order, and the filter is rebuilt at
+    twice the size once it holds more JTIs than it was sized for.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.capacity = 0
+        self.count = 0
+        self.last_id = 0
+        self.synced_at = None
+
+    def reset(self, capacity):
+        self.capacity = max(capacity, MIN_CAPACITY)
+        self.size = math.ceil(
+            -self.capacity * math.log(FALSE_POSITIVE_RATE) / math.log(2) ** 2
+        )
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.last_id = 0
+
+    def positions(self, jti):
+        digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def _add(self, jti):
+        added = False
+        for position in self.positions(jti):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                added = True
+        # JTIs read again by a rescan are not counted twice.
+        if added:
+            self.count += 1
+
+    def add(self, jti):
+        with self.lock:
+            if self.synced_at is not None:
+                self._add(jti)
+
+    def sync(self):
+        with self.lock:
+            if self.synced_at is None:
+                self.reset(BlacklistedToken.objects.count() * 2)
+            rows = BlacklistedToken.objects.filter(
+                id__gt=max(self.last_id - RESCAN_IDS, 0)
+            ).order_by("id").values_list("id", "token__jti")
+            for row_id, jti in rows.iterator(chunk_size=10000):
+                self._add(jti)
+                self.last_id = max(self.last_id, row_id)
+            # Over capacity the false positive rate climbs; start over
+            # with a filter sized from the table.
+            oversized = self.count > self.capacity
+            self.synced_at = None if oversized else time.monotonic()
+        if oversized:
+            self.sync()
+
+    def might_contain(self, jti):
+        if (self.synced_at is None
+                or time.monotonic() - self.synced_at >= SYNC_INTERVAL):
+            self.sync()
+        with self.lock:
+            return all(
+                self.bits[position >> 3] & (1 << (position & 7))
+                for position in self.positions(jti)
+            )
+
+
+blacklist_filter = BlacklistFilter()
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher whose iteration count comes from the
+    PASSWORD_HASH_ITERATIONS setting. It keeps the pbkdf2_sha256
+    algorithm name, so existing hashes verify, and must_update() reports
+    any hash with a different count, which makes the next successful login
+    rehash it at the configured cost.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_HASH_ITERATIONS",
+                       PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+# hashes, hash_seconds_total, hash_seconds_max, rejected, queue_depth
+metrics = Counter()
+
+
+class PasswordHashPoolBusy(Exception):
+    pass
+
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for password hashing, so PBKDF2 work from the
+    async login/signup views never runs on the event loop thread.
+
+    At most max_pending calls may be queued or running; beyond that run()
+    raises PasswordHashPoolBusy straight away instead of queueing, which
+    lets a login burst shed load rather than starve other requests.
+    """
+
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="password-hash")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                metrics["hashes"] += 1
+                metrics["hash_seconds_total"] += elapsed
+                metrics["hash_seconds_max"] = max(
+                    metrics["hash_seconds_max"], elapsed
+                )
+
+    async def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                metrics["rejected"] += 1
+            raise PasswordHashPoolBusy
+        with self.lock:
+            metrics["queue_depth"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._timed,
+                                              func, *args)
+        finally:
+            with self.lock:
+                metrics["queue_depth"] -= 1
+            self.slots.release()
+
+
+password_pool = PasswordHashPool(
+    workers=getattr(settings, "PASSWORD_HASH_WORKERS", 4),
+    max_pending=getattr(settings, "PASSWORD_HASH_MAX_PENDING", 64),
+)
@@ -0,0 +1,66 @@
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from authentication.renderers import FastJSONRenderer, orjson
+
+
+def legacy_render(data, accepted_media_type=None, renderer_context=None):
+    # UserRenderer before the single-pass rewrite.
+    if "ErrorDetail" in str(data):
+        return json.dumps({"errors": data})
+    return json.dumps(data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Times FastJSONRenderer against DRF's JSONRenderer and the old "
+        "str()-scanning UserRenderer on a post list payload."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        now = timezone.now().isoformat()
+        data = [
+            {
+                "uuid": str(uuid.uuid4()),
+                "user": {"id": i, "first_name": "Test", "last_name": "User",
+                         "email": f"user{i}@example.com", "gender": "M"},
+                "count_comments": 2,
+                "count_likes": 3,
+                "comments": [{"uuid": str(uuid.uuid4()), "user": i,
+                              "comment": "Nice post!", "created_at": now}] * 2,
+                "likes": [{"uuid": str(uuid.uuid4()), "user": i,
+                           "created_at": now}] * 3,
+                "title": f"post {i}",
+                "content": "content " * 20,
+                "created_at": now,
+            }
+            for i in range(options["items"])
+        ]
+
+        stdlib = FastJSONRenderer()
+        stdlib.use_orjson = False
+        candidates = [
+            ("legacy UserRenderer", legacy_render),
+            ("DRF JSONRenderer", JSONRenderer().render),
+            ("FastJSONRenderer (json)", stdlib.render),
+        ]
+        if orjson is not None:
+            candidates.append(("FastJSONRenderer (orjson)",
+                               FastJSONRenderer().render))
+
+        for name, render in candidates:
+            render(data)
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                render(data)
+            elapsed = (time.perf_counter() - start) * 1000 / options["repeat"]
+            self.stdout.write(f"{name:<28} {elapsed:8.3f} ms")
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired outstanding tokens and their blacklist entries in "
+        "small batches, each in its own short transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Tokens deleted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=0.05,
+            help="Seconds to pause between batches (default: 0.05).",
+        )
+
+    def handle(self, *args, **options):
+        now = aware_utcnow()
+        expired = OutstandingToken.objects.filter(expires_at__lte=now)
+
+        total = 0
+        last_id = 0
+        while True:
+            ids = list(
+                expired.filter(id__gt=last_id).order_by("id")
+                .values_list("id", flat=True)[:options["batch_size"]]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
+            last_id = ids[-1]
+            time.sleep(options["sleep"])
+
+        self.stdout.write(f"Purged {total} expired tokens.")
@@ -16,11 +16,12 @@ from django.db import models
 class UserManager(BaseUserManager):
     def create_user(
         self, email, first_name, last_name,
-        gender, password=None, password2=None
+        gender, password=None, password2=None, encoded_password=None
     ):
         """
         Creates and saves a User with the given email, first_name, last_name,
-        gender and password.
+        gender and password. encoded_password, when given, is an already
+        hashed password and skips hashing here.
         """
         if not email:
             raise ValueError("User must have an email address")
@@ -32,7 +33,10 @@ class UserManager(BaseUserManager):
             gender=gender,
         )
 
-        user.set_password(password)
+        if encoded_password is not None:
+            user.password = encoded_password
+        else:
+            user.set_password(password)
         user.save(using=self._db)
         return user
 
@@ -73,6 +77,11 @@ class User(AbstractBaseUser):
     is_admin = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, maintained by core views and repaired by
+    # `manage.py reconcile_counters`.
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
     objects = UserManager()
 
     USERNAME_FIELD = "email"
@@ -1,16 +1,54 @@
 import json
 
 from rest_framework import renderers
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer that encodes straight to compact UTF-8 bytes in a single
+    pass, using orjson when it is installed. Indented output (browsable
+    API, `; indent=` media type) still goes through DRF's renderer.
+    """
 
-class UserRenderer(renderers.JSONRenderer):
     charset = "utf-8"
+    use_orjson = orjson is not None
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
-        response = ""
-        if "ErrorDetail" in str(data):
-            response = json.dumps({"errors": data})
-        else:
-            response = json.dumps(data)
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return self.encode(data)
+
+    def encode(self, data):
+        if self.use_orjson:
+            return orjson.dumps(data, default=self.encoder_class().default,
+                                option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            data, cls=self.encoder_class, ensure_ascii=False,
+            allow_nan=not self.strict, separators=(",", ":"),
+        ).encode()
 
-        return response
+
+class UserRenderer(FastJSONRenderer):
+    """
+    Wraps error payloads as {"errors": ...}. An error is a response built
+    from an exception, or a 4xx/5xx response carrying serializer errors,
+    so the payload itself never has to be scanned.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        if response is not None and (
+            response.exception
+            or (response.status_code >= 400
+                and isinstance(data, (ReturnDict, ReturnList)))
+        ):
+            data = {"errors": data}
+        return super().render(data, accepted_media_type, renderer_context)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
 
 from authentication.models import User
+from authentication.tokens import RefreshToken
 
 
 class UserSignupSerializer(serializers.ModelSerializer):
@@ -51,3 +53,11 @@ class UserDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "first_name", "last_name", "email", "gender"]
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
@@ -0,0 +1,11 @@
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.backends import USER_CACHE, user_cache_key
+from authentication.models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    caches[USER_CACHE].delete(user_cache_key(instance.pk))
@@ -1 +1,200 @@
-# from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.backends import CachedJWTAuthentication
+from authentication.blacklist import blacklist_filter
+from authentication.hashing import PasswordHashPoolBusy
+from authentication.models import User
+from authentication.tokens import RefreshToken
+
+
+def make_user(email="user@example.com"):
+    return User.objects.create_user(
+        email=email, first_name="Test", last_name="User",
+        gender="F", password="pass12345",
+    )
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        caches["users"].clear()
+        self.user = make_user()
+        token = AccessToken.for_user(self.user)
+        self.request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.backend = CachedJWTAuthentication()
+
+    def authenticate(self):
+        user, _ = self.backend.authenticate(self.request)
+        return user
+
+    def test_user_is_cached_until_saved(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), self.user)
+
+        self.user.first_name = "Changed"
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().first_name, "Changed")
+
+    def test_counters_are_read_fresh(self):
+        self.authenticate()
+        # bump() updates counters without a signal.
+        User.objects.filter(pk=self.user.pk).update(followers_count=3)
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(user.followers_count, 3)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        blacklist_filter.synced_at = None
+        self.user = make_user()
+
+    @mock.patch("authentication.blacklist.SYNC_INTERVAL", 60)
+    def test_blacklisted_refresh_token_is_rejected(self):
+        kept = RefreshToken.for_user(self.user)
+        revoked = RefreshToken.for_user(self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.post(reverse("logout"), {"refresh": str(revoked)},
+                    format="json")
+
+        with self.assertRaises(TokenError):
+            RefreshToken(str(revoked))
+        # Never blacklisted: answered by the filter alone.
+        with self.assertNumQueries(0):
+            RefreshToken(str(kept))
+
+    @mock.patch("authentication.blacklist.SYNC_INTERVAL", 0)
+    def test_rows_committed_out_of_order_are_synced(self):
+        first, late, last = (
+            OutstandingToken.objects.get(jti=RefreshToken.for_user(
+                self.user)["jti"])
+            for _ in range(3)
+        )
+        row = BlacklistedToken.objects.create(token=first)
+        BlacklistedToken.objects.create(id=row.id + 2, token=last)
+        self.assertTrue(blacklist_filter.might_contain(last.jti))
+        # Committed after the sync that read a higher id.
+        BlacklistedToken.objects.create(id=row.id + 1, token=late)
+        self.assertTrue(blacklist_filter.might_contain(late.jti))
+
+    def test_purge_keeps_live_tokens(self):
+        live = RefreshToken.for_user(self.user)
+        for _ in range(3):
+            RefreshToken.for_user(self.user).blacklist()
+        OutstandingToken.objects.exclude(jti=live["jti"]).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        call_command("purge_expired_tokens", "--batch-size", "1",
+                     "--sleep", "0", stdout=StringIO())
+
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertTrue(OutstandingToken.objects.filter(
+            jti=live["jti"]).exists())
+
+
+class UserRendererTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        make_user()
+
+    def test_validation_errors_are_wrapped_once(self):
+        response = self.client.post(reverse("signup"), {
+            "email": "new@example.com", "first_name": "New",
+            "last_name": "User", "gender": "M",
+            "password": "a", "password2": "b",
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("non_field_errors", response.json()["errors"])
+
+        response = self.client.post(reverse("login"), {
+            "email": "user@example.com", "password": "wrong",
+        }, format="json")
+        self.assertEqual(response.json(), {
+            "errors": {"non_field_errors": ["Email or Password is not Valid!"]}
+        })
+
+    def test_success_payload_is_not_scanned_or_wrapped(self):
+        response = self.client.post(reverse("login"), {
+            "email": "user@example.com", "password": "pass12345",
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["msg"],
+                         "User Logged In Successfully!")
+        self.assertIsInstance(response.content, bytes)
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            self.user = make_user()
+
+    def login(self):
+        return self.client.post(reverse("login"), {
+            "email": "user@example.com", "password": "pass12345",
+        }, content_type="application/json")
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=2000)
+    def test_login_rehashes_at_configured_cost(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+
+        # At the configured cost already: verified, not rehashed.
+        rehashed = self.user.password
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, rehashed)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_busy_pool_sheds_load(self):
+        with mock.patch("authentication.hashing.password_pool.run",
+                        side_effect=PasswordHashPoolBusy):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_failed_login_sends_signal(self):
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials["email"])
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        response = self.client.post(reverse("login"), {
+            "email": "user@example.com", "password": "wrong",
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(failures, ["user@example.com"])
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000, AUTHENTICATION_BACKENDS=[
+        "django.contrib.auth.backends.AllowAllUsersModelBackend",
+    ])
+    def test_other_backends_go_through_authenticate(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.login().status_code, 200)
@@ -0,0 +1,21 @@
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.settings import api_settings
+
+from authentication.blacklist import blacklist_filter
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    RefreshToken that consults blacklist_filter before querying the
+    BlacklistedToken table, so tokens that were never blacklisted are
+    verified without touching the database.
+    """
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -1,9 +1,15 @@
 from django.urls import path
 
-from authentication.views import UserLogin, UserSignup, UserLogout
+from authentication.views import (
+    AsyncUserLogin,
+    AsyncUserSignup,
+    PasswordHashStats,
+    UserLogout,
+)
 
 urlpatterns = [
-    path("signup/", UserSignup.as_view(), name="signup"),
-    path("login/", UserLogin.as_view(), name="login"),
+    path("signup/", AsyncUserSignup.as_view(), name="signup"),
+    path("login/", AsyncUserLogin.as_view(), name="login"),
     path("logout/", UserLogout.as_view(), name="logout"),
+    path("hash/stats/", PasswordHashStats.as_view(), name="hash_stats"),
 ]
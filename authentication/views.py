@@ -1,14 +1,35 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.contrib.auth.signals import user_login_failed
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from authentication.hashing import (
+    PasswordHashPoolBusy,
+    metrics,
+    password_pool,
+)
+from authentication.models import User
 from authentication.renderers import UserRenderer
 from authentication.serializers import (
     UserLoginSerializer,
     UserSignupSerializer,
 )
+from authentication.tokens import RefreshToken
 
 
 # Generating Token
@@ -21,50 +42,6 @@ def get_tokens_for_user(user):
     }
 
 
-class UserSignup(APIView):
-    renderer_classes = [UserRenderer]
-
-    def post(self, request, format=None):
-        serializer = UserSignupSerializer(data=request.data)
-        if serializer.is_valid(raise_exception=True):
-            user = serializer.save()
-            token = get_tokens_for_user(user)
-            return Response(
-                {"msg": "User Signed Up Successfully!", "token": token},
-                status=status.HTTP_201_CREATED,
-            )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class UserLogin(APIView):
-    renderer_classes = [UserRenderer]
-
-    def post(self, request, format=None):
-        serializer = UserLoginSerializer(data=request.data)
-        if serializer.is_valid(raise_exception=True):
-            email = serializer.data.get("email")
-            password = serializer.data.get("password")
-            user = authenticate(email=email, password=password)
-            if user is not None:
-                token = get_tokens_for_user(user)
-                return Response(
-                    {"msg": "User Logged In Successfully!", "token": token},
-                    status=status.HTTP_200_OK,
-                )
-            else:
-                return Response(
-                    {
-                        "errors": {
-                            "non_field_errors": [
-                                "Email or Password is not Valid!"
-                            ]
-                        }
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
 class UserLogout(APIView):
     renderer_classes = [UserRenderer]
     permission_classes = [IsAuthenticated]
@@ -82,3 +59,146 @@ class UserLogout(APIView):
             {"msg": "Something went wrong!"},
             status=status.HTTP_400_BAD_REQUEST,
         )
+
+
+
+MODEL_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+def needs_rehash(encoded):
+    """
+    Whether encoded was made with another hasher than the default or an
+    outdated cost, as check_password() decides. identify_hasher() would
+    return the last hasher listed for the algorithm, e.g. the stock
+    PBKDF2PasswordHasher and its iteration count.
+    """
+    preferred = get_hasher("default")
+    return (identify_hasher(encoded).algorithm != preferred.algorithm
+            or preferred.must_update(encoded))
+
+
+async def pooled_authenticate(request, email, password):
+    """
+    What authenticate() does with only ModelBackend configured, with the
+    user loaded by the async ORM and the hashing on password_pool. Raises
+    PasswordHashPoolBusy.
+    """
+    user = await User.objects.filter(email=email).afirst()
+    if user is None or not user.is_active:
+        # Hash anyway so unknown emails take as long as bad passwords.
+        await password_pool.run(make_password, password)
+        user = None
+    elif not await password_pool.run(check_password, password,
+                                     user.password):
+        user = None
+    elif needs_rehash(user.password):
+        user.password = await password_pool.run(make_password, password)
+        await user.asave(update_fields=["password"])
+    if user is None:
+        user_login_failed.send(
+            sender=__name__,
+            credentials={"email": email, "password": "********"},
+            request=request,
+        )
+    return user
+
+
+def parse_body(request):
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+    return request.POST
+
+
+def busy_response():
+    response = JsonResponse(
+        {"errors": {"msg": "Server is busy, please retry."}}, status=503
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncUserSignup(View):
+    """
+    Async signup: validation and the INSERT run through sync_to_async and
+    the password is hashed on password_pool, off the event loop.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({"errors": {"msg": "Invalid JSON body."}},
+                                status=400)
+        serializer = UserSignupSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse({"errors": serializer.errors}, status=400)
+
+        try:
+            encoded = await password_pool.run(
+                make_password, serializer.validated_data["password"]
+            )
+        except PasswordHashPoolBusy:
+            return busy_response()
+
+        user = await sync_to_async(serializer.save)(encoded_password=encoded)
+        token = await sync_to_async(get_tokens_for_user)(user)
+        return JsonResponse(
+            {"msg": "User Signed Up Successfully!", "token": token},
+            status=201,
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncUserLogin(View):
+    """
+    Async login. With the default ModelBackend the password is checked on
+    password_pool (see pooled_authenticate()); with any other
+    AUTHENTICATION_BACKENDS it goes through authenticate(), so their
+    checks apply.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({"errors": {"msg": "Invalid JSON body."}},
+                                status=400)
+        serializer = UserLoginSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse({"errors": serializer.errors}, status=400)
+        email = serializer.validated_data["email"]
+        password = serializer.validated_data["password"]
+
+        if settings.AUTHENTICATION_BACKENDS == [MODEL_BACKEND]:
+            try:
+                user = await pooled_authenticate(request, email, password)
+            except PasswordHashPoolBusy:
+                return busy_response()
+        else:
+            user = await sync_to_async(authenticate)(
+                request, email=email, password=password
+            )
+
+        if user is None:
+            return JsonResponse(
+                {
+                    "errors": {
+                        "non_field_errors": ["Email or Password is not Valid!"]
+                    }
+                },
+                status=400,
+            )
+        token = await sync_to_async(get_tokens_for_user)(user)
+        return JsonResponse(
+            {"msg": "User Logged In Successfully!", "token": token},
+            status=200,
+        )
+
+
+class PasswordHashStats(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response(dict(metrics), status=status.HTTP_200_OK)
@@ -1,6 +1,264 @@
-from rest_framework.pagination import LimitOffsetPagination
+import base64
+import binascii
+import json
+import uuid
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from core import counts, search
+from core.models import Post, Student
 
 
 class CustomPagination(LimitOffsetPagination):
     # default_limit = 5
     pass
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first keyset pagination on (created_at, uuid).
+
+    Each page is one indexed range query: the cursor carries the position
+    of the last row seen, so deep pages cost the same as the first one and
+    no COUNT(*) is issued. Cursors are opaque base64 tokens.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    page_size_query_param = "limit"
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = "Invalid cursor"
+
+    # Total rows for the "count" key, see get_count().
+    count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.get_count(queryset, request, view)
+        queryset, position = self.start_page(queryset, request)
+        return self.finish_page(list(queryset), position)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, using the async ORM."""
+        queryset, position = self.start_page(queryset, request)
+        return self.finish_page([obj async for obj in queryset], position)
+
+    def start_page(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request)
+
+        # Fetch one extra row to find out whether a further page exists.
+        queryset = self.apply_keyset(queryset, position, self.reverse)
+        return queryset[:self.page_size + 1], position
+
+    def apply_keyset(self, queryset, position, reverse,
+                     fields=("created_at", "uuid")):
+        """
+        Orders queryset along the keyset and filters it to the rows after
+        position. fields names the (timestamp, uuid) columns to use.
+        """
+        created, pk = fields
+        if reverse:
+            queryset = queryset.order_by(created, pk)
+            if position is not None:
+                queryset = queryset.filter(
+                    Q(**{f"{created}__gt": position[0]})
+                    | Q(**{f"{pk}__gt": position[1]}),
+                    **{f"{created}__gte": position[0]},
+                )
+        else:
+            queryset = queryset.order_by(f"-{created}", f"-{pk}")
+            if position is not None:
+                # The redundant bound gives SQLite an index range to seek.
+                queryset = queryset.filter(
+                    Q(**{f"{created}__lt": position[0]})
+                    | Q(**{f"{pk}__lt": position[1]}),
+                    **{f"{created}__lte": position[0]},
+                )
+        return queryset
+
+    def get_count(self, queryset, request, view):
+        """
+        With ?count=true, the count of queryset in the view's count_mode
+        (exact, cached or estimated, see core.counts); otherwise None, as
+        for views without a count_mode. view.get_exact_count() may return
+        a denormalized counter to use as the exact count.
+        """
+        mode = getattr(view, "count_mode", None)
+        if mode is None or (
+            request.query_params.get(self.count_query_param) != "true"
+        ):
+            return None
+        return counts.count(queryset, mode,
+                            getattr(view, "get_exact_count", None))
+
+    def finish_page(self, results, position):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(data["c"])
+            pk = uuid.UUID(data["u"])
+            reverse = bool(data.get("r", False))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (created_at, pk), reverse
+
+    def encode_position(self, obj, reverse):
+        data = {"c": obj.created_at.isoformat(), "u": str(obj.uuid)}
+        if reverse:
+            data["r"] = 1
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    def encode_cursor(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_position(obj, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ])
+        if self.count is not None:
+            response["count"] = self.count
+            response.move_to_end("count", last=False)
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True,
+                         "format": "uri"},
+                "previous": {"type": "string", "nullable": True,
+                             "format": "uri"},
+                "results": schema,
+                "count": {"type": "integer"},
+            },
+        }
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Keyset pagination over several sources of (created_at, post uuid)
+    rows, merged into one page of posts.
+
+    paginate_queryset() takes a list of (queryset, fields) pairs; each
+    queryset is cut to one page with apply_keyset() before merging, and
+    the winning post ids are loaded with Post.objects.with_engagement().
+    """
+
+    def paginate_queryset(self, sources, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request)
+
+        rows = {}
+        for queryset, fields in sources:
+            queryset = self.apply_keyset(queryset, position, self.reverse,
+                                         fields)
+            for created_at, pk in queryset.values_list(*fields)[
+                :self.page_size + 1
+            ]:
+                rows[pk] = created_at
+        keys = sorted(((created_at, pk) for pk, created_at in rows.items()),
+                      reverse=not self.reverse)[:self.page_size + 1]
+
+        posts = Post.objects.with_engagement().in_bulk(
+            [pk for _, pk in keys]
+        )
+        results = [posts[pk] for _, pk in keys if pk in posts]
+        return self.finish_page(results, position)
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Keyset pagination over ranked student search results, on (rank, id)
+    where rank is the FTS5 bm25 score, lower first.
+
+    paginate_queryset() takes an FTS5 query built by core.search instead
+    of a queryset. Ranks depend on the whole index, so a page fetched
+    after students changed may skip or repeat a row at its edge.
+    """
+
+    def paginate_queryset(self, query, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request)
+
+        rows = search.ranked(query, position, self.reverse,
+                             self.page_size + 1)
+        students = Student.objects.with_courses().in_bulk(
+            [pk for _, pk in rows]
+        )
+        results = []
+        for rank, pk in rows:
+            if pk in students:
+                students[pk].search_rank = rank
+                results.append(students[pk])
+        return self.finish_page(results, position)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = (float(data["k"]), int(data["i"]))
+            reverse = bool(data.get("r", False))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_position(self, obj, reverse):
+        data = {"k": obj.search_rank, "i": obj.pk}
+        if reverse:
+            data["r"] = 1
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
@@ -0,0 +1,211 @@
+import asyncio
+
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from authentication.backends import CachedJWTAuthentication
+from authentication.renderers import FastJSONRenderer
+from core.CustomPagination import KeysetPagination
+from core.serializers import (
+    CommentSerializer,
+    FollowersSerializer,
+    FollowingsSerializer,
+    LikeSerializer,
+    PostGetSerializer,
+)
+
+from .cache import post_cache
+from .models import Comment, Follow, Like, Post
+
+
+class AsyncAPIView(View):
+    """
+    Base class for the ASGI-native read endpoints.
+
+    DRF's APIView is sync only, so these are plain Django async views that
+    reuse the JWT authentication, keyset pagination, serializers and JSON
+    renderer of the sync API and return the same payloads. Serializers are
+    only handed rows whose relations are already loaded, so they never
+    touch the database from the event loop.
+    """
+
+    authentication = CachedJWTAuthentication()
+    pagination_class = KeysetPagination
+    renderer = FastJSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or (
+            handler is None
+        ):
+            return await self.http_method_not_allowed(request, *args,
+                                                      **kwargs)
+        try:
+            auth = await self.authentication.aauthenticate(request)
+        except exceptions.APIException as exc:
+            return self.unauthorized(request, exc.detail)
+        if auth is None:
+            return self.unauthorized(
+                request, exceptions.NotAuthenticated.default_detail
+            )
+        request.user, request.auth = auth
+        try:
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.respond({"detail": exc.detail}, exc.status_code)
+
+    def respond(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer.encode(data), status=status_code,
+                            content_type="application/json")
+
+    def unauthorized(self, request, detail):
+        response = self.respond({"detail": detail},
+                                status.HTTP_401_UNAUTHORIZED)
+        response["WWW-Authenticate"] = (
+            self.authentication.authenticate_header(request)
+        )
+        return response
+
+    async def paginate(self, request, queryset):
+        self.paginator = self.pagination_class()
+        return await self.paginator.apaginate_queryset(queryset,
+                                                       Request(request))
+
+    def paginated(self, data):
+        return self.respond({
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
+            "results": data,
+        })
+
+
+class AsyncPostRetrieveView(AsyncAPIView):
+    """
+    This view is used to retrieve post on given id
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        data = post_cache.get(pk)
+        if data is None:
+            post = await Post.objects.with_engagement().filter(pk=pk).afirst()
+            if post is None:
+                raise exceptions.NotFound()
+            data = PostGetSerializer(post).data
+            post_cache.set(pk, data)
+        return self.respond(data)
+
+
+class AsyncPostListView(AsyncAPIView):
+    """
+    This view will show all the post
+    """
+
+    async def get(self, request, *args, **kwargs):
+        posts = await self.paginate(request, Post.objects.with_engagement())
+        return self.paginated(PostGetSerializer(posts, many=True).data)
+
+
+class AsyncPostCommentsListView(AsyncAPIView):
+    """
+    This view will show all comment on given post
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        # The post's counters and the page of comments don't depend on
+        # each other, so both queries are issued together.
+        post, comments = await asyncio.gather(
+            Post.objects.filter(pk=pk).only(
+                "likes_count", "comments_count"
+            ).afirst(),
+            self.paginate(request, Comment.objects.filter(post=pk)),
+        )
+        if post is None or (post.likes_count == 0
+                            and post.comments_count == 0):
+            return self.respond(
+                {"msg": "No Likes and Comments on this Post!"},
+                status.HTTP_404_NOT_FOUND,
+            )
+        return self.respond({
+            "Count Of Comments": post.comments_count,
+            "Comments": CommentSerializer(comments, many=True).data,
+            "Count Of Likes": post.likes_count,
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
+        })
+
+
+class AsyncCommentListView(AsyncAPIView):
+    """
+    This view will show all comment of all the post
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        comments = await self.paginate(request,
+                                       Comment.objects.filter(user=pk))
+        if comments or "cursor" in request.GET:
+            return self.paginated(CommentSerializer(comments, many=True).data)
+        return self.respond(
+            {"msg": "No Comments available for this User!"},
+            status.HTTP_404_NOT_FOUND,
+        )
+
+
+class AsyncLikeRetrieveView(AsyncAPIView):
+    """
+    This view is used to get the specified Like details
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        like = await Like.objects.filter(pk=pk).afirst()
+        if like is None:
+            return self.respond({"errors": {"msg": "Invalid Like Id!"}},
+                                status.HTTP_400_BAD_REQUEST)
+        return self.respond(LikeSerializer(like).data)
+
+
+class AsyncLikeListView(AsyncAPIView):
+    """
+    This view will show all the likes on post
+    """
+
+    async def get(self, request, *args, **kwargs):
+        likes = await self.paginate(request, Like.objects.all())
+        return self.paginated(LikeSerializer(likes, many=True).data)
+
+
+class AsyncFollowersListView(AsyncAPIView):
+    """
+    This view will show all the follower follow the given user
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        followers = await self.paginate(
+            request,
+            Follow.objects.filter(user_following=pk).select_related("user"),
+        )
+        if followers or "cursor" in request.GET:
+            return self.paginated(
+                FollowersSerializer(followers, many=True).data
+            )
+        return self.respond({"msg": "No Followers for this User!"},
+                            status.HTTP_404_NOT_FOUND)
+
+
+class AsyncFollowingListView(AsyncAPIView):
+    """
+    This view will show all the users the given user follows
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        following = await self.paginate(
+            request,
+            Follow.objects.filter(user=pk).select_related("user_following"),
+        )
+        if following or "cursor" in request.GET:
+            return self.paginated(
+                FollowingsSerializer(following, many=True).data
+            )
+        return self.respond({"msg": "No Followings for this User!"},
+                            status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,71 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+# Process-wide hit/miss/eviction counters, keyed "<cache>.<event>".
+stats = Counter()
+_missing = object()
+
+
+class CountingLocMemCache(LocMemCache):
+    """
+    LocMemCache that records its hits, misses and the entries its culls
+    evict in stats, under the cache's LOCATION.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.stats_name = name or "locmem"
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            stats[f"{self.stats_name}.misses"] += 1
+            return default
+        stats[f"{self.stats_name}.hits"] += 1
+        return value
+
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        stats[f"{self.stats_name}.evictions"] += before - len(self._cache)
+
+
+class PostCache:
+    """
+    Serialized PostGetSerializer output keyed by post id, stored in the
+    "posts" cache alias. Entries are dropped by the model signals in
+    core.signals whenever the post, its likes or its comments change.
+    """
+
+    alias = "posts"
+
+    @property
+    def enabled(self):
+        return getattr(settings, "POST_CACHE_ENABLED", True)
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def key(self, pk):
+        return f"post:{pk}"
+
+    def get(self, pk):
+        if not self.enabled:
+            return None
+        return self.backend.get(self.key(pk))
+
+    def set(self, pk, data):
+        if self.enabled:
+            self.backend.set(self.key(pk), data)
+
+    def invalidate(self, pk):
+        if self.enabled:
+            self.backend.delete(self.key(pk))
+            stats[f"{self.alias}.invalidations"] += 1
+
+
+post_cache = PostCache()
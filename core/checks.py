@@ -0,0 +1,22 @@
+from django.core import checks
+from django.db import connection
+
+
+@checks.register(checks.Tags.database)
+def table_count_triggers(app_configs, databases=None, **kwargs):
+    """Warns when a table counted by core_tablecount lost its triggers."""
+    from core import counts
+
+    if not databases or "default" not in databases:
+        return []
+    if "core_tablecount" not in connection.introspection.table_names():
+        return []
+    return [
+        checks.Warning(
+            f"{table} has no core_tablecount triggers, so exact counts of "
+            f"it are frozen.",
+            hint="Run `manage.py reconcile_counters --only tables`.",
+            id="core.W001",
+        )
+        for table in counts.missing_triggers()
+    ]
@@ -0,0 +1,90 @@
+from django.db.models import (
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from authentication.models import User
+from core import counts
+from core.models import Comment, Follow, Like, Post, TableCount
+
+
+def bump(queryset, **deltas):
+    """
+    Adjusts the given counter columns of every row in queryset with a
+    single UPDATE, e.g. bump(Post.objects.filter(pk=pk), likes_count=1).
+    Decrements never take a counter below zero.
+    """
+    values = {}
+    for field, delta in deltas.items():
+        if delta < 0:
+            values[field] = Greatest(F(field) + delta, 0)
+        else:
+            values[field] = F(field) + delta
+    return queryset.update(**values)
+
+
+def count_of(queryset, field):
+    """
+    Correlated COUNT(*) of queryset rows whose `field` points at the outer
+    row, usable inside update()/annotate().
+    """
+    counts = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recount_posts(queryset):
+    """Recomputes likes_count and comments_count for the given posts."""
+    return queryset.update(
+        likes_count=count_of(Like.objects.all(), "post"),
+        comments_count=count_of(Comment.objects.all(), "post"),
+    )
+
+
+def recount_users(queryset):
+    """Recomputes the follow and post counters for the given users."""
+    return queryset.update(
+        followers_count=count_of(Follow.objects.all(), "user_following"),
+        following_count=count_of(Follow.objects.all(), "user"),
+        posts_count=count_of(Post.objects.all(), "user"),
+    )
+
+
+def recount_tables(queryset):
+    """
+    Reinstalls missing count triggers, then sets the given TableCount rows
+    to COUNT(*) of their tables.
+    """
+    models = {model._meta.db_table: model for model in counts.COUNTED}
+    names = [name for name in queryset.values_list("pk", flat=True)
+             if name in models]
+    missing = set(counts.missing_triggers())
+    counts.install_triggers([name for name in names if name in missing])
+    for name in names:
+        # One statement, so no write lands between the count and the set.
+        TableCount.objects.filter(pk=name).update(
+            total=Coalesce(Subquery(
+                models[name].objects.order_by()
+                .annotate(table=Value(name)).values("table")
+                .annotate(total=Count("*")).values("total"),
+                output_field=IntegerField(),
+            ), 0)
+        )
+    return len(names)
+
+
+RECOUNTERS = {
+    "posts": (Post, recount_posts),
+    "tables": (TableCount, recount_tables),
+    "users": (User, recount_users),
+}
@@ -0,0 +1,114 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from core.models import Comment, Follow, Like, Post, Student, TableCount
+
+EXACT = "exact"
+CACHED = "cached"
+ESTIMATED = "estimated"
+MODES = (EXACT, CACHED, ESTIMATED)
+
+# Tables with a TableCount row kept by triggers.
+COUNTED = {Student, Post, Like, Comment, Follow}
+
+# Seconds a cached count may lag behind the table.
+CACHE_TIMEOUT = getattr(settings, "COUNT_CACHE_TIMEOUT", 60)
+CACHE_ALIAS = "counts"
+
+
+def triggers(table):
+    return [f"{table}_count_insert", f"{table}_count_delete"]
+
+
+def missing_triggers():
+    """
+    db_tables of COUNTED models lacking a count trigger. SQLite drops a
+    table's triggers when a migration rebuilds it (AlterField, RemoveField
+    and the like); their TableCount rows then stop moving until
+    `reconcile_counters --only tables` reinstalls them.
+    """
+    if connection.vendor != "sqlite":
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        installed = {name for name, in cursor.fetchall()}
+    return sorted(model._meta.db_table for model in COUNTED
+                  if not installed.issuperset(triggers(model._meta.db_table)))
+
+
+def install_triggers(tables):
+    """The triggers of migration 0008_table_counts, where missing."""
+    with connection.cursor() as cursor:
+        for table in tables:
+            for event, delta in (("INSERT", "+ 1"), ("DELETE", "- 1")):
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_count_"
+                    f"{event.lower()} AFTER {event} ON {table} BEGIN "
+                    f"UPDATE core_tablecount SET total = total {delta} "
+                    f"WHERE name = '{table}'; END"
+                )
+
+
+def whole_table(queryset):
+    """Whether queryset counts every row of a COUNTED table."""
+    query = queryset.query
+    return (queryset.model in COUNTED and not query.where
+            and not query.distinct and not query.is_sliced)
+
+
+def exact(queryset, counter=None):
+    """
+    Exact count: counter() when given (a denormalized count the caller
+    already keeps), the TableCount row for a whole table, or COUNT(*).
+    """
+    if counter is not None:
+        total = counter()
+        if total is not None:
+            return total
+    if whole_table(queryset):
+        total = TableCount.objects.filter(
+            pk=queryset.model._meta.db_table
+        ).values_list("total", flat=True).first()
+        if total is not None:
+            return total
+    return queryset.count()
+
+
+def cached(queryset, counter=None):
+    """exact() shared between requests for up to CACHE_TIMEOUT seconds."""
+    sql, params = queryset.query.sql_with_params()
+    key = "count:" + hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    return caches[CACHE_ALIAS].get_or_set(
+        key, lambda: exact(queryset, counter), CACHE_TIMEOUT
+    )
+
+
+def estimated(queryset, counter=None):
+    """
+    The row count ANALYZE recorded in sqlite_stat1 for a whole table;
+    otherwise, and until ANALYZE has run, cached().
+    """
+    if connection.vendor == "sqlite" and whole_table(queryset):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+    return cached(queryset, counter)
+
+
+COUNTERS = {EXACT: exact, CACHED: cached, ESTIMATED: estimated}
+
+
+def count(queryset, mode=EXACT, counter=None):
+    return COUNTERS[mode](queryset, counter)
@@ -0,0 +1,124 @@
+from django.conf import settings
+
+from authentication.models import User
+from core.models import Follow, Post, TimelineEntry
+
+# Authors with more followers than this are not fanned out on write; their
+# posts are pulled into followers' feeds at read time instead.
+FANOUT_MAX_FOLLOWERS = getattr(settings, "FEED_FANOUT_MAX_FOLLOWERS", 5000)
+# Recent posts copied into a timeline when a new follow is created.
+FOLLOW_BACKFILL = getattr(settings, "FEED_FOLLOW_BACKFILL", 50)
+BATCH_SIZE = 1000
+
+
+def _write_entries(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE,
+                                      ignore_conflicts=True)
+
+
+def _followers_count(user_id):
+    # Read from the table, not an instance loaded before the last bump().
+    return User.objects.filter(pk=user_id).values_list(
+        "followers_count", flat=True
+    ).first() or 0
+
+
+def fan_out(post):
+    """
+    Copies post into the timeline of every follower of its author, unless
+    the author is above FANOUT_MAX_FOLLOWERS.
+    """
+    followers_count = _followers_count(post.user_id)
+    if not followers_count or followers_count > FANOUT_MAX_FOLLOWERS:
+        return
+    follower_ids = Follow.objects.filter(
+        user_following=post.user_id
+    ).values_list("user", flat=True).iterator(chunk_size=BATCH_SIZE)
+    _write_entries(
+        TimelineEntry(owner_id=follower_id, post_id=post.pk,
+                      created_at=post.created_at)
+        for follower_id in follower_ids
+    )
+
+
+def fan_out_many(posts):
+    """fan_out() for a batch of posts, reading each author's graph once."""
+    by_author = {}
+    for post in posts:
+        by_author.setdefault(post.user_id, []).append(post)
+    popular = set(User.objects.filter(
+        pk__in=by_author, followers_count__gt=FANOUT_MAX_FOLLOWERS
+    ).values_list("pk", flat=True))
+    for author_id, author_posts in by_author.items():
+        if author_id in popular:
+            continue
+        follower_ids = list(Follow.objects.filter(
+            user_following=author_id
+        ).values_list("user", flat=True))
+        _write_entries(
+            TimelineEntry(owner_id=follower_id, post_id=post.pk,
+                          created_at=post.created_at)
+            for post in author_posts
+            for follower_id in follower_ids
+        )
+
+
+def _recent_posts(author_id):
+    return list(Post.objects.filter(user=author_id).order_by(
+        "-created_at"
+    ).values_list("uuid", "created_at")[:FOLLOW_BACKFILL])
+
+
+def backfill(follower, followee):
+    """
+    Copies followee's most recent posts into follower's timeline. Call it
+    after bumping followee's followers_count.
+    """
+    if _followers_count(followee.pk) > FANOUT_MAX_FOLLOWERS:
+        return
+    _write_entries(
+        TimelineEntry(owner_id=follower.pk, post_id=pk, created_at=created_at)
+        for pk, created_at in _recent_posts(followee.pk)
+    )
+
+
+def prune(follower, followee):
+    """
+    Drops followee's posts from follower's timeline after an unfollow.
+    Call it after bumping followee's followers_count: when that takes
+    followee back down to FANOUT_MAX_FOLLOWERS, their recent posts, made
+    while they were pulled on read, are fanned out to the followers left.
+    """
+    TimelineEntry.objects.filter(owner=follower, post__user=followee).delete()
+    if _followers_count(followee) != FANOUT_MAX_FOLLOWERS:
+        return
+    posts = _recent_posts(followee)
+    follower_ids = Follow.objects.filter(
+        user_following=followee
+    ).values_list("user", flat=True).iterator(chunk_size=BATCH_SIZE)
+    _write_entries(
+        TimelineEntry(owner_id=follower_id, post_id=pk, created_at=created_at)
+        for follower_id in follower_ids
+        for pk, created_at in posts
+    )
+
+
+def sources_for(user):
+    """
+    (queryset, keyset fields) pairs for FeedPagination: the materialized
+    timeline plus a pull from followed authors that are not fanned out.
+    Every post of an author above FANOUT_MAX_FOLLOWERS is pulled, including
+    ones fanned out before they crossed it; the merge drops duplicates.
+    """
+    sources = [
+        (TimelineEntry.objects.filter(owner=user), ("created_at", "post")),
+    ]
+    pulled = list(User.objects.filter(
+        user_following__user=user,
+        followers_count__gt=FANOUT_MAX_FOLLOWERS,
+    ).values_list("pk", flat=True))
+    if pulled:
+        sources.append(
+            (Post.objects.filter(user__in=pulled), ("created_at", "uuid"))
+        )
+    return sources
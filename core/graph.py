@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+
+from core.models import Follow
+
+logger = logging.getLogger(__name__)
+
+# Seconds between rebuilds of the index from the Follow table by the
+# background thread start() runs, so writes made by other worker processes
+# show up. None disables rebuilding.
+REBUILD_AFTER = getattr(settings, "FOLLOW_GRAPH_TTL", 60)
+
+
+def _contains(ids, value):
+    i = bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+def _intersect(left, right):
+    """Merges two sorted arrays and returns the ids present in both."""
+    result = array("q")
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] < right[j]:
+            i += 1
+        elif left[i] > right[j]:
+            j += 1
+        else:
+            result.append(left[i])
+            i += 1
+            j += 1
+    return result
+
+
+class FollowGraph:
+    """
+    Adjacency index of the Follow table: for every user id a sorted
+    array of follower ids and one of followed ids.
+
+    The index is built by start(), which the WSGI and ASGI entry points
+    call, or else on first use, and kept current by add()/remove(), which
+    the follow and unfollow views call after their transaction commits.
+    start() also rebuilds it every REBUILD_AFTER seconds on a background
+    thread and swaps the result in, so requests never wait for a rebuild.
+    It answers membership and mutual queries; counts come from the User
+    counter columns, which every process's writes update.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Held while building, so concurrent first requests build once.
+        self.load_lock = threading.Lock()
+        self.followers = {}
+        self.following = {}
+        self.loaded_at = None
+        # add()/remove() calls made while a build runs, replayed onto its
+        # result, which may have been read before they committed.
+        self.pending = None
+        self.refresher = None
+
+    def load(self):
+        with self.lock:
+            self.pending = []
+        try:
+            followers = {}
+            following = {}
+            edges = Follow.objects.order_by().values_list(
+                "user", "user_following"
+            ).iterator(chunk_size=10000)
+            for user_id, following_id in edges:
+                followers.setdefault(following_id, array("q")).append(user_id)
+                following.setdefault(user_id, array("q")).append(following_id)
+            for ids in (*followers.values(), *following.values()):
+                ids[:] = array("q", sorted(ids))
+            with self.lock:
+                for apply, user_id, following_id in self.pending:
+                    apply(followers, following, user_id, following_id)
+                self.followers = followers
+                self.following = following
+                self.loaded_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+
+    def start(self):
+        """Builds the index and keeps rebuilding it on a daemon thread."""
+        if REBUILD_AFTER is None:
+            self.ensure_loaded()
+            return
+        with self.load_lock:
+            if self.refresher is not None:
+                return
+            self.refresher = threading.Thread(
+                target=self.refresh, name="follow-graph", daemon=True
+            )
+        self.refresher.start()
+
+    def refresh(self):
+        while True:
+            try:
+                with self.load_lock:
+                    self.load()
+            except Exception:
+                logger.exception("Rebuilding the follow graph failed.")
+            finally:
+                connection.close()
+            time.sleep(REBUILD_AFTER)
+
+    def ensure_loaded(self):
+        if self.loaded_at is None:
+            with self.load_lock:
+                if self.loaded_at is None:
+                    self.load()
+
+    @staticmethod
+    def _add(followers, following, user_id, following_id):
+        for index, key, value in (
+            (followers, following_id, user_id),
+            (following, user_id, following_id),
+        ):
+            ids = index.setdefault(key, array("q"))
+            i = bisect_left(ids, value)
+            if i == len(ids) or ids[i] != value:
+                ids.insert(i, value)
+
+    @staticmethod
+    def _remove(followers, following, user_id, following_id):
+        for index, key, value in (
+            (followers, following_id, user_id),
+            (following, user_id, following_id),
+        ):
+            ids = index.get(key)
+            if ids is None:
+                continue
+            i = bisect_left(ids, value)
+            if i < len(ids) and ids[i] == value:
+                del ids[i]
+
+    def _apply(self, apply, user_id, following_id):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((apply, user_id, following_id))
+            if self.loaded_at is not None:
+                apply(self.followers, self.following, user_id, following_id)
+
+    def add(self, user_id, following_id):
+        self._apply(self._add, user_id, following_id)
+
+    def remove(self, user_id, following_id):
+        self._apply(self._remove, user_id, following_id)
+
+    def followers_of(self, user_id):
+        self.ensure_loaded()
+        return self.followers.get(user_id, array("q"))
+
+    def following_of(self, user_id):
+        self.ensure_loaded()
+        return self.following.get(user_id, array("q"))
+
+    def follows(self, user_id, following_id):
+        return _contains(self.following_of(user_id), following_id)
+
+    def mutual(self, user_id):
+        """Ids of users that user_id follows and who follow user_id back."""
+        return _intersect(self.followers_of(user_id),
+                          self.following_of(user_id))
+
+
+follow_graph = FollowGraph()
@@ -0,0 +1,112 @@
+import uuid
+
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from core.cache import post_cache
+from core.models import Like, Post
+
+
+class PostNotFound(Exception):
+    pass
+
+
+def _column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def _prep(model, name, value):
+    return model._meta.get_field(name).get_db_prep_value(value, connection)
+
+
+def _insert_like(cursor, user_id, post_id):
+    fields = [Like._meta.get_field(name)
+              for name in ("uuid", "user", "post", "created_at")]
+    values = (uuid.uuid4(), user_id, post_id, timezone.now())
+    sql = "%s %s (%s) VALUES (%s) %s" % (
+        connection.ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        connection.ops.quote_name(Like._meta.db_table),
+        ", ".join(connection.ops.quote_name(f.column) for f in fields),
+        ", ".join(["%s"] * len(fields)),
+        connection.ops.on_conflict_suffix_sql(
+            fields, OnConflict.IGNORE, None, None
+        ),
+    )
+    cursor.execute(sql, [
+        field.get_db_prep_value(value, connection)
+        for field, value in zip(fields, values)
+    ])
+    return cursor.rowcount
+
+
+def _delete_like(cursor, user_id, post_id):
+    cursor.execute(
+        "DELETE FROM %s WHERE %s = %%s AND %s = %%s" % (
+            connection.ops.quote_name(Like._meta.db_table),
+            _column(Like, "user"),
+            _column(Like, "post"),
+        ),
+        [_prep(Like, "user", user_id), _prep(Like, "post", post_id)],
+    )
+    return cursor.rowcount
+
+
+def _update_returning():
+    """
+    Whether the backend supports UPDATE ... RETURNING. Django's
+    can_return_columns_from_insert only covers INSERT: MariaDB sets it but
+    cannot return columns from an UPDATE.
+    """
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _likes_count(cursor, post_id, delta):
+    table = connection.ops.quote_name(Post._meta.db_table)
+    count = _column(Post, "likes_count")
+    pk = _column(Post, "uuid")
+    params = [_prep(Post, "uuid", post_id)]
+    if delta:
+        sql = (
+            "UPDATE %s SET %s = CASE WHEN %s + %d > 0 THEN %s + %d ELSE 0 END"
+            " WHERE %s = %%s" % (table, count, count, delta, count, delta, pk)
+        )
+        # SQLite >= 3.35 and PostgreSQL hand the new value straight back.
+        if _update_returning():
+            cursor.execute(sql + " RETURNING %s" % count, params)
+            row = cursor.fetchone()
+            return row[0] if row else None
+        cursor.execute(sql, params)
+        if cursor.rowcount == 0:
+            return None
+    cursor.execute("SELECT %s FROM %s WHERE %s = %%s" % (count, table, pk),
+                   params)
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def set_like(user_id, post_id, liked):
+    """
+    Likes or unlikes post_id for user_id and returns the post's like count.
+
+    Liking is one conflict-ignoring INSERT against the (user, post) unique
+    constraint and unliking is one DELETE, so repeated or concurrent calls
+    are idempotent. likes_count only moves when a row actually changed.
+    Raises PostNotFound for an unknown post.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if liked:
+            changed = _insert_like(cursor, user_id, post_id)
+        else:
+            changed = _delete_like(cursor, user_id, post_id)
+        count = _likes_count(cursor, post_id,
+                             changed if liked else -changed)
+        if count is None:
+            raise PostNotFound(post_id)
+        if changed:
+            transaction.on_commit(lambda: post_cache.invalidate(post_id))
+    return count
@@ -0,0 +1,594 @@
+"""
+Load-testing harness behind `manage.py loadtest`.
+
+A Dataset seeds users, posts, comments, likes, follows and students at a
+preset size. Every route in core.urls and authentication.urls has a
+Scenario that builds the requests for it. A transport sends them either
+through Django's WSGI handler in-process, where SQL queries are counted
+per request, or to a running server over HTTP.
+"""
+import itertools
+import json
+import os
+import re
+import secrets
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication import urls as authentication_urls
+from authentication.models import User
+from authentication.tokens import RefreshToken
+from core import feed, search
+from core import urls as core_urls
+from core.counters import recount_posts, recount_users
+from core.models import (
+    Comment,
+    Course,
+    Follow,
+    Like,
+    Post,
+    Student,
+    Teacher,
+)
+
+# users; posts per user; comments, likes per post; follows per user;
+# students.
+SIZES = {
+    "small": {"users": 20, "posts": 5, "comments": 2, "likes": 2,
+              "follows": 5, "students": 50},
+    "medium": {"users": 200, "posts": 20, "comments": 5, "likes": 5,
+               "follows": 20, "students": 1000},
+    "large": {"users": 2000, "posts": 20, "comments": 5, "likes": 5,
+              "follows": 50, "students": 10000},
+}
+PREFIX = "loadtest"
+BATCH_SIZE = 1000
+BULK_ITEMS = 10
+ROUTE_PARAM = re.compile(r"<(?:\w+:)?(\w+)>")
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def email(tag):
+    return f"{PREFIX}-{tag}@example.com"
+
+
+class Dataset:
+    """
+    Seeded rows, all owned by users whose email starts with PREFIX so
+    cleanup() can remove them. The first user is the one the requests
+    authenticate as. Their password is random per run and only held in
+    memory, so a run killed before cleanup() leaves no known login.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.plain_password = secrets.token_urlsafe()
+        self.password = make_password(self.plain_password)
+
+    def make_users(self, total, tag):
+        return User.objects.bulk_create(
+            (User(email=email(f"{tag}-{uuid.uuid4().hex}"),
+                  first_name="Load", last_name="Test", gender="M",
+                  password=self.password)
+             for _ in range(total)),
+            batch_size=BATCH_SIZE,
+        )
+
+    def make_posts(self, total, user):
+        return Post.objects.bulk_create(
+            (Post(user=user, title=f"post {i}", content="load test")
+             for i in range(total)),
+            batch_size=BATCH_SIZE,
+        )
+
+    def seed(self, admin=False):
+        """
+        Creates the dataset. With admin, also an admin user for the
+        admin-only scenarios; it has no usable password and is only
+        reachable through admin_token.
+        """
+        size = self.size
+        self.actor = User.objects.create(
+            email=email("actor"), first_name="Load", last_name="Test",
+            gender="M", password=self.password,
+        )
+        self.admin_token = None
+        if admin:
+            self.admin = User(email=email("admin"), first_name="Load",
+                              last_name="Test", gender="M", is_admin=True)
+            self.admin.set_unusable_password()
+            self.admin.save()
+            self.admin_token = str(AccessToken.for_user(self.admin))
+        self.users = [self.actor] + self.make_users(size["users"] - 1,
+                                                    "user")
+        self.other = self.users[-1]
+
+        self.posts = Post.objects.bulk_create(
+            (Post(user=user, title=f"post {i}", content="load test")
+             for user in self.users for i in range(size["posts"])),
+            batch_size=BATCH_SIZE,
+        )
+        self.comments = Comment.objects.bulk_create(
+            (Comment(user=self.users[(n + i) % len(self.users)], post=post,
+                     comment="load test")
+             for n, post in enumerate(self.posts)
+             for i in range(size["comments"])),
+            batch_size=BATCH_SIZE,
+        )
+        self.likes = Like.objects.bulk_create(
+            (Like(user=self.users[(n + i) % len(self.users)], post=post)
+             for n, post in enumerate(self.posts)
+             for i in range(min(size["likes"], len(self.users)))),
+            batch_size=BATCH_SIZE,
+        )
+        Follow.objects.bulk_create(
+            (Follow(user=user, user_following=self.users[(n + i) %
+                                                         len(self.users)])
+             for n, user in enumerate(self.users)
+             for i in range(1, min(size["follows"], len(self.users) - 1) + 1)),
+            batch_size=BATCH_SIZE,
+        )
+        self.seed_students()
+
+        recount_users(User.objects.filter(email__startswith=PREFIX))
+        recount_posts(Post.objects.filter(user__email__startswith=PREFIX))
+        feed.fan_out_many(self.posts)
+
+        self.actor_posts = [post for post in self.posts
+                            if post.user_id == self.actor.pk]
+        self.actor_comments = [comment for comment in self.comments
+                               if comment.user_id == self.actor.pk]
+        self.access_token = str(AccessToken.for_user(self.actor))
+
+    def seed_students(self):
+        teacher = Teacher.objects.create(name=f"{PREFIX} teacher")
+        courses = Course.objects.bulk_create(
+            Course(name=f"{PREFIX} course {i}", teacher=teacher)
+            for i in range(3)
+        )
+        students = Student.objects.bulk_create(
+            (Student(name=f"Student {i}", roll=f"{PREFIX}-{i}",
+                     address="load test", email=email(f"student-{i}"))
+             for i in range(self.size["students"])),
+            batch_size=BATCH_SIZE,
+        )
+        Student.courses.through.objects.bulk_create(
+            (Student.courses.through(student_id=student.pk,
+                                     course_id=courses[n % 3].pk)
+             for n, student in enumerate(students)),
+            batch_size=BATCH_SIZE,
+        )
+        search.index_students(student.pk for student in students)
+
+    def cleanup(self):
+        Student.objects.filter(roll__startswith=PREFIX).delete()
+        Teacher.objects.filter(name__startswith=PREFIX).delete()
+        User.objects.filter(email__startswith=f"{PREFIX}-").delete()
+
+
+class Scenario:
+    """
+    Requests for one route. build(data, i) returns a dict with the
+    optional keys kwargs (route parameters), body and query for request
+    i; setup(data, total), when given, creates the rows that write
+    scenarios consume, one per request. admin scenarios authenticate as
+    the dataset's admin user instead of its actor.
+    """
+
+    def __init__(self, method, build, setup=None, expect=(200, 201, 207),
+                 admin=False):
+        self.method = method
+        self.build = build
+        self.setup = setup
+        self.expect = expect
+        self.admin = admin
+
+
+def pick(rows, i):
+    return rows[i % len(rows)].pk
+
+
+def fresh_posts(data, total):
+    data.pool = data.make_posts(total, data.other)
+
+
+def actor_posts(data, total):
+    data.pool = data.make_posts(total, data.actor)
+
+
+def actor_comments(data, total):
+    data.pool = Comment.objects.bulk_create(
+        (Comment(user=data.actor, post=data.posts[i % len(data.posts)],
+                 comment="load test")
+         for i in range(total)),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def fresh_users(data, total):
+    data.pool = data.make_users(total, "pool")
+
+
+def followed_users(data, total):
+    fresh_users(data, total)
+    Follow.objects.bulk_create(
+        (Follow(user=data.actor, user_following=user) for user in data.pool),
+        batch_size=BATCH_SIZE,
+    )
+    recount_users(User.objects.filter(pk=data.actor.pk))
+
+
+def refresh_tokens(data, total):
+    data.pool = [str(RefreshToken.for_user(data.actor))
+                 for _ in range(total)]
+
+
+def bulk_posts(data, total):
+    fresh_posts(data, total * BULK_ITEMS)
+
+
+SCENARIOS = {
+    "post/create/": Scenario("POST", lambda d, i: {
+        "body": {"title": f"post {i}", "content": "load test"}}),
+    "post/bulk/create/": Scenario("POST", lambda d, i: {
+        "body": [{"title": f"post {i}.{n}", "content": "load test"}
+                 for n in range(BULK_ITEMS)]}),
+    "post/get/<uuid:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.posts, i)}}),
+    "post/cache/stats/": Scenario("GET", lambda d, i: {}, admin=True),
+    "post/list/": Scenario("GET", lambda d, i: {}),
+    "post/update/<uuid:pk>/": Scenario("PATCH", lambda d, i: {
+        "kwargs": {"pk": pick(d.actor_posts, i)},
+        "body": {"content": f"updated {i}"}}),
+    "post/delete/<uuid:pk>/": Scenario("DELETE", lambda d, i: {
+        "kwargs": {"pk": d.pool[i].pk}}, setup=actor_posts),
+    "comments/post/<uuid:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.posts, i)}}),
+    "comments/user/<int:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.users, i)}}),
+    "comment/create/": Scenario("POST", lambda d, i: {
+        "body": {"post": str(pick(d.posts, i)), "comment": "load test"}}),
+    "comment/bulk/create/": Scenario("POST", lambda d, i: {
+        "body": [{"post": str(pick(d.posts, i * BULK_ITEMS + n)),
+                  "comment": "load test"} for n in range(BULK_ITEMS)]}),
+    "comment/delete/<uuid:pk>/": Scenario("DELETE", lambda d, i: {
+        "kwargs": {"pk": d.pool[i].pk}}, setup=actor_comments),
+    "comment/update/<uuid:pk>/": Scenario("PUT", lambda d, i: {
+        "kwargs": {"pk": pick(d.actor_comments, i)},
+        "body": {"post": str(d.actor_comments[i % len(d.actor_comments)]
+                             .post_id),
+                 "comment": f"updated {i}"}}),
+    "followers/user/<int:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.users, i)}}),
+    "followings/user/<int:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.users, i)}}),
+    "follower/create/<int:pk>/": Scenario("POST", lambda d, i: {
+        "kwargs": {"pk": d.pool[i].pk}}, setup=fresh_users),
+    "follower/delete/<int:pk>/": Scenario("DELETE", lambda d, i: {
+        "kwargs": {"pk": d.pool[i].pk}}, setup=followed_users),
+    "followers/count/<int:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.users, i)}}),
+    "followers/mutual/<int:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.users, i)}}),
+    "follows/<int:pk>/<int:other>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.users, i), "other": pick(d.users, i + 1)}}),
+    "feed/": Scenario("GET", lambda d, i: {}),
+    "like/create/": Scenario("POST", lambda d, i: {
+        "body": {"post": str(d.pool[i].pk)}}, setup=fresh_posts),
+    "like/bulk/create/": Scenario("POST", lambda d, i: {
+        "body": [{"post": str(d.pool[i * BULK_ITEMS + n].pk)}
+                 for n in range(BULK_ITEMS)]}, setup=bulk_posts),
+    "like/toggle/<uuid:pk>/": Scenario("POST", lambda d, i: {
+        "kwargs": {"pk": pick(d.posts, i)}}),
+    "like/get/<uuid:pk>/": Scenario("GET", lambda d, i: {
+        "kwargs": {"pk": pick(d.likes, i)}}),
+    "like/list/": Scenario("GET", lambda d, i: {}),
+    "students/name/": Scenario("POST", lambda d, i: {
+        "body": {"name_start": "Student 1"}}),
+    "students/email/": Scenario("GET", lambda d, i: {
+        "query": {"email_is": email(f"student-{i % d.size['students']}")}}),
+    "students/teacher/": Scenario("POST", lambda d, i: {
+        "body": {"teacher_name": f"{PREFIX} teacher"}}),
+    "students/exclude/": Scenario("POST", lambda d, i: {
+        "body": {"input_name": "Student 1"}}),
+    "students/total/": Scenario("GET", lambda d, i: {}),
+    "students/subject/": Scenario("POST", lambda d, i: {
+        "body": {"enrolled_sub": f"{PREFIX} course 0"}}),
+    "students/all/": Scenario("GET", lambda d, i: {}),
+    "export/": Scenario("GET", lambda d, i: {}),
+    "students/search/": Scenario("GET", lambda d, i: {
+        "query": {"q": f"student {i % 10} course"}}),
+    "signup/": Scenario("POST", lambda d, i: {
+        "body": {"email": email(f"signup-{uuid.uuid4().hex}"),
+                 "first_name": "Load", "last_name": "Test", "gender": "M",
+                 "password": d.plain_password,
+                 "password2": d.plain_password}}),
+    "login/": Scenario("POST", lambda d, i: {
+        "body": {"email": d.actor.email, "password": d.plain_password}}),
+    "logout/": Scenario("POST", lambda d, i: {
+        "body": {"refresh": d.pool[i]}}, setup=refresh_tokens),
+    "hash/stats/": Scenario("GET", lambda d, i: {}, admin=True),
+}
+
+
+def iter_routes(patterns, prefix=""):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns,
+                                   prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            yield prefix + str(pattern.pattern)
+
+
+def routes():
+    """(url prefix, route) for every route the harness should drive."""
+    for mount, module in (("/api/", core_urls),
+                          ("/api/user/", authentication_urls)):
+        for route in iter_routes(module.urlpatterns):
+            yield mount, route
+
+
+def is_test_database():
+    """
+    Whether the default database is an in-memory or test_ database, as
+    created by the test runner, rather than one holding real data.
+    """
+    name = str(connection.settings_dict["NAME"])
+    return (connection.vendor == "sqlite"
+            and connection.creation.is_in_memory_db(name)
+            ) or os.path.basename(name).startswith("test_")
+
+
+def scenario_for(route):
+    # The async/ routes take the same requests as their sync versions.
+    return SCENARIOS.get(route.removeprefix("async/"))
+
+
+def build_path(mount, route, kwargs):
+    return mount + ROUTE_PARAM.sub(lambda m: str(kwargs[m.group(1)]), route)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class WSGITransport:
+    """Requests through Django's WSGI handler, one Client per thread."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, body, query, token):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = Client(
+                raise_request_exception=False
+            )
+        if query:
+            path += "?" + urllib.parse.urlencode(query)
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = client.generic(
+                method, path,
+                data=json.dumps(body) if body is not None else "",
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            # Streamed bodies run their queries while being read.
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        return response.status_code, counter.count
+
+    def finish_thread(self):
+        connection.close()
+
+
+class HTTPTransport:
+    """
+    Requests to a running server at base_url. Query counts are read from
+    the Server-Timing header, so they are only reported for requests the
+    server sampled.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body, query, token):
+        url = self.base_url + path
+        if query:
+            url += "?" + urllib.parse.urlencode(query)
+        request = urllib.request.Request(
+            url, method=method,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers={"Authorization": f"Bearer {token}",
+                     "Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, self.queries(response.headers)
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code, self.queries(exc.headers)
+
+    def queries(self, headers):
+        # Sent by core.middleware on sampled requests.
+        match = SERVER_TIMING_QUERIES.search(
+            headers.get("Server-Timing", "")
+        )
+        return int(match.group(1)) if match else None
+
+    def finish_thread(self):
+        pass
+
+
+def percentile(cuts, p):
+    return round(cuts[p - 1] * 1000, 3)
+
+
+def summarize(method, route, latencies, statuses, queries, elapsed,
+              expect):
+    cuts = (statistics.quantiles(latencies, n=100, method="inclusive")
+            if len(latencies) > 1 else latencies * 99)
+    errors = sum(total for code, total in statuses.items()
+                 if code not in expect)
+    return {
+        "method": method,
+        "route": route,
+        "requests": len(latencies),
+        "errors": errors,
+        "status": {str(code): total for code, total in
+                   sorted(statuses.items())},
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": percentile(cuts, 50),
+            "p95": percentile(cuts, 95),
+            "p99": percentile(cuts, 99),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "queries_per_request": (round(statistics.fmean(queries), 2)
+                                if queries else None),
+    }
+
+
+def run_scenario(transport, data, mount, route, scenario, requests,
+                 concurrency, warmup):
+    total = requests + warmup
+    if scenario.setup is not None:
+        scenario.setup(data, total)
+    calls = []
+    for i in range(total):
+        spec = scenario.build(data, i)
+        calls.append((scenario.method,
+                      build_path(mount, route, spec.get("kwargs", {})),
+                      spec.get("body"), spec.get("query")))
+
+    token = data.admin_token if scenario.admin else data.access_token
+    for call in calls[:warmup]:
+        transport.request(*call, token)
+
+    measured = calls[warmup:]
+    positions = itertools.count()
+    results = [None] * len(measured)
+
+    def worker():
+        try:
+            while True:
+                i = next(positions)
+                if i >= len(measured):
+                    return
+                start = time.perf_counter()
+                status, queries = transport.request(*measured[i], token)
+                results[i] = (time.perf_counter() - start, status, queries)
+        finally:
+            transport.finish_thread()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for _, status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    queries = [count for _, _, count in results if count is not None]
+    return summarize(scenario.method, mount + route,
+                     [latency for latency, _, _ in results], statuses,
+                     queries, elapsed, scenario.expect)
+
+
+def run(transport, size, requests, concurrency, warmup, only=None,
+        log=None):
+    """
+    Seeds a dataset, drives every route and returns the results document.
+    Seeded rows are removed afterwards.
+    """
+    selected = []
+    skipped = []
+    for mount, route in routes():
+        name = mount + route
+        scenario = scenario_for(route)
+        if scenario is None:
+            skipped.append(name)
+        elif not only or any(part in name for part in only):
+            selected.append((name, mount, route, scenario))
+
+    data = Dataset(SIZES[size])
+    data.cleanup()
+    data.seed(admin=any(scenario.admin for *_, scenario in selected))
+    endpoints = {}
+    try:
+        for name, mount, route, scenario in selected:
+            endpoints[name] = run_scenario(
+                transport, data, mount, route, scenario, requests,
+                concurrency, warmup,
+            )
+            if log:
+                log(name, endpoints[name])
+    finally:
+        data.cleanup()
+    return {
+        "meta": {
+            "created_at": timezone.now().isoformat(),
+            "transport": type(transport).__name__,
+            "size": size,
+            "dataset": SIZES[size],
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "database": connection.vendor,
+        },
+        "endpoints": endpoints,
+        "skipped": skipped,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Rows of (endpoint, baseline p95, current p95, p95 change,
+    throughput change, baseline queries, current queries, regressed) for
+    endpoints in both documents. An endpoint regressed when its p95
+    latency grew by more than threshold (a fraction) or it runs more
+    queries per request.
+    """
+    rows = []
+    for name, new in current["endpoints"].items():
+        old = baseline["endpoints"].get(name)
+        if old is None:
+            continue
+        old_p95 = old["latency_ms"]["p95"]
+        new_p95 = new["latency_ms"]["p95"]
+        p95_change = (new_p95 - old_p95) / old_p95 if old_p95 else 0.0
+        rps_change = ((new["throughput_rps"] - old["throughput_rps"])
+                      / old["throughput_rps"]
+                      if old["throughput_rps"] else 0.0)
+        old_queries = old["queries_per_request"]
+        new_queries = new["queries_per_request"]
+        more_queries = (old_queries is not None and new_queries is not None
+                        and new_queries > old_queries)
+        rows.append((name, old_p95, new_p95, p95_change, rps_change,
+                     old_queries, new_queries,
+                     p95_change > threshold or more_queries))
+    return rows
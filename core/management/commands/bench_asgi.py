@@ -0,0 +1,125 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+from core.models import Comment, Follow, Post
+
+BENCH_EMAIL = "bench-asgi{}@example.com"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares throughput of the sync read endpoints served through the "
+        "WSGI handler (a thread per concurrent request) with their async "
+        "versions served through the ASGI handler (one event loop). Both "
+        "run in-process against the configured database; seed data is "
+        "committed so worker threads can see it and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=500,
+                            help="Requests per endpoint and mode.")
+        parser.add_argument("--concurrency", type=int, default=16)
+
+    def handle(self, *args, **options):
+        author, reader = self.seed(options["posts"])
+        try:
+            # The test clients send Host: testserver.
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+            ):
+                self.run(author, reader, options)
+        finally:
+            User.objects.filter(pk__in=[author.pk, reader.pk]).delete()
+
+    def seed(self, total):
+        User.objects.filter(email__in=[BENCH_EMAIL.format(1),
+                                       BENCH_EMAIL.format(2)]).delete()
+        author, reader = [
+            User.objects.create_user(
+                email=BENCH_EMAIL.format(i), first_name="Bench",
+                last_name="User", gender="M",
+            )
+            for i in (1, 2)
+        ]
+        Follow.objects.create(user=reader, user_following=author)
+        posts = Post.objects.bulk_create(
+            Post(user=author, title=f"post {i}", content="benchmark",
+                 comments_count=1)
+            for i in range(total)
+        )
+        Comment.objects.bulk_create(
+            Comment(user=reader, post=post, comment="benchmark")
+            for post in posts
+        )
+        return author, reader
+
+    def run(self, author, reader, options):
+        post = Post.objects.filter(user=author).first()
+        endpoints = [
+            ("post/get/%s/" % post.pk, "post get"),
+            ("post/list/?limit=20", "post list"),
+            ("comments/post/%s/" % post.pk, "post comments"),
+            ("followers/user/%s/" % author.pk, "followers"),
+        ]
+        headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(reader)}",
+        }
+        self.stdout.write(
+            f"{'endpoint':<14} {'wsgi req/s':>10} {'asgi req/s':>10} "
+            f"{'wsgi p99':>9} {'asgi p99':>9}"
+        )
+        for path, label in endpoints:
+            wsgi = self.run_wsgi("/api/" + path, headers, options)
+            asgi = asyncio.run(
+                self.run_asgi("/api/async/" + path, headers, options)
+            )
+            self.stdout.write(
+                f"{label:<14} {wsgi[0]:>10.1f} {asgi[0]:>10.1f} "
+                f"{wsgi[1]:>8.1f}ms {asgi[1]:>8.1f}ms"
+            )
+
+    def summarize(self, elapsed, latencies):
+        p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+        return len(latencies) / elapsed, p99
+
+    def run_wsgi(self, url, headers, options):
+        client = Client()
+
+        def call(_):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            list(pool.map(call, range(options["concurrency"])))
+            start = time.perf_counter()
+            latencies = list(pool.map(call, range(options["requests"])))
+        return self.summarize(time.perf_counter() - start, latencies)
+
+    async def run_asgi(self, url, headers, options):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(options["concurrency"])
+
+        async def call():
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - start
+
+        await asyncio.gather(*(call() for _ in range(options["concurrency"])))
+        start = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(call() for _ in range(options["requests"]))
+        )
+        return self.summarize(time.perf_counter() - start, latencies)
@@ -0,0 +1,99 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from authentication.models import User
+from core.CustomPagination import KeysetPagination
+from core.models import Post
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares LimitOffsetPagination with KeysetPagination on the post "
+        "list at increasing page depths. Seed data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--pages", default="1,10,100,1000",
+                            help="Comma separated page numbers to time.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        page_size = options["page_size"]
+        pages = [int(page) for page in options["pages"].split(",")]
+        self.stdout.write(f"Seeding {options['posts']} posts...")
+        self.seed(options["posts"])
+
+        factory = APIRequestFactory()
+        queryset = Post.objects.all()
+        ordered = queryset.order_by("-created_at", "-uuid")
+        self.stdout.write(
+            f"{'page':>6} {'offset ms':>10} {'keyset ms':>10}"
+        )
+        for page in pages:
+            offset = (page - 1) * page_size
+            if offset >= options["posts"]:
+                break
+
+            offset_request = Request(factory.get(
+                "/", {"limit": page_size, "offset": offset}
+            ))
+            offset_ms = self.time(
+                lambda: list(LimitOffsetPagination().paginate_queryset(
+                    ordered, offset_request
+                )),
+                options["repeat"],
+            )
+
+            params = {"limit": page_size}
+            if offset:
+                # Position the cursor on the last row of the previous page
+                # (setup only, not timed).
+                params["cursor"] = KeysetPagination().encode_position(
+                    ordered[offset - 1], reverse=False
+                )
+            keyset_request = Request(factory.get("/", params))
+            keyset_ms = self.time(
+                lambda: KeysetPagination().paginate_queryset(
+                    queryset, keyset_request
+                ),
+                options["repeat"],
+            )
+            self.stdout.write(f"{page:>6} {offset_ms:>10.3f} {keyset_ms:>10.3f}")
+
+    def seed(self, total):
+        user = User.objects.create_user(
+            email="bench-pagination@example.com", first_name="Bench",
+            last_name="User", gender="M",
+        )
+        batch = 5000
+        for start in range(0, total, batch):
+            Post.objects.bulk_create(
+                Post(user=user, title=f"post {i}", content="benchmark")
+                for i in range(start, min(start + batch, total))
+            )
+
+    def time(self, func, repeat):
+        func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) * 1000 / repeat
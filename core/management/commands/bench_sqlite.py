@@ -0,0 +1,100 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from django.db import transaction
+
+from authentication.models import User
+from core.counters import bump
+from core.models import Post
+
+BENCH_EMAIL = "bench-sqlite@example.com"
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a mixed read/write workload from several threads against the "
+        "configured database and reports throughput and lock errors. "
+        "Connections are released after every operation the way a request "
+        "cycle does, so CONN_MAX_AGE is taken into account. Run it with and "
+        "without SQLITE_PRODUCTION_PROFILE=true to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+        parser.add_argument("--posts", type=int, default=1000,
+                            help="Posts seeded before the run.")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+        self.stdout.write(
+            f"engine={connection.settings_dict['ENGINE']} "
+            f"journal_mode={journal_mode} "
+            f"conn_max_age={connection.settings_dict['CONN_MAX_AGE']}"
+        )
+
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        self.user = User.objects.create_user(
+            email=BENCH_EMAIL, first_name="Bench", last_name="User",
+            gender="M",
+        )
+        Post.objects.bulk_create(
+            Post(user=self.user, title=f"post {i}", content="benchmark")
+            for i in range(options["posts"])
+        )
+        try:
+            self.run(options)
+        finally:
+            User.objects.filter(pk=self.user.pk).delete()
+
+    def run(self, options):
+        results = Counter()
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["seconds"]
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local = Counter()
+            while time.perf_counter() < deadline:
+                kind = ("write" if rng.random() < options["write_ratio"]
+                        else "read")
+                try:
+                    getattr(self, kind)()
+                    local[kind] += 1
+                except OperationalError:
+                    local[f"{kind}_errors"] += 1
+                finally:
+                    close_old_connections()
+            connection.close()
+            with lock:
+                results.update(local)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options["threads"]) as pool:
+            list(pool.map(worker, range(options["threads"])))
+        elapsed = time.perf_counter() - start
+
+        for kind in ("read", "write"):
+            self.stdout.write(
+                f"{kind:>5}: {results[kind] / elapsed:8.1f} ops/s "
+                f"({results[kind]} ok, {results[f'{kind}_errors']} locked)"
+            )
+
+    def read(self):
+        list(Post.objects.with_engagement().filter(user=self.user)[:20])
+
+    def write(self):
+        # Reads before writing, like the create views do.
+        with transaction.atomic():
+            User.objects.filter(pk=self.user.pk).exists()
+            Post.objects.create(user=self.user, title="bench",
+                                content="benchmark")
+            bump(User.objects.filter(pk=self.user.pk), posts_count=1)
@@ -0,0 +1,84 @@
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from core import search
+from core.CustomPagination import KeysetPagination
+from core.models import Comment, Follow, Like, Post, Student, TimelineEntry
+
+PAGE = 51
+
+
+def keyset(queryset, fields=("created_at", "uuid")):
+    """A page past a cursor, the query a deep keyset page runs."""
+    position = (timezone.now(), uuid.uuid4())
+    return KeysetPagination().apply_keyset(queryset, position, False,
+                                           fields)[:PAGE]
+
+
+def hot_queries():
+    """(endpoint, label, queryset) for the queries behind core.urls."""
+    post, user = uuid.uuid4(), 1
+    queries = [
+        ("postlist", "page", keyset(Post.objects.select_related("user"))),
+        ("postlist", "prefetch comments",
+         Comment.objects.filter(post__in=[post, uuid.uuid4()])),
+        ("postlist", "prefetch likes",
+         Like.objects.filter(post__in=[post, uuid.uuid4()])),
+        ("postget", "post", Post.objects.filter(pk=post)),
+        ("postdata", "comments", keyset(Comment.objects.filter(post=post))),
+        ("commentuser", "comments", keyset(Comment.objects.filter(user=user))),
+        ("likelist", "page", keyset(Like.objects.all())),
+        ("followers_of_user", "page", keyset(
+            Follow.objects.filter(user_following=user).select_related("user")
+        )),
+        ("following_of_user", "page", keyset(
+            Follow.objects.filter(user=user).select_related("user_following")
+        )),
+        ("followcheck", "exists",
+         Follow.objects.filter(user=user, user_following=2)),
+        ("feed", "timeline", keyset(TimelineEntry.objects.filter(owner=user),
+                                    ("created_at", "post"))),
+        ("feed", "pulled authors",
+         keyset(Post.objects.filter(user__in=[user, 2]))),
+        ("followercreate", "backfill", Post.objects.filter(
+            user=user
+        ).order_by("-created_at").values_list("uuid", "created_at")[:50]),
+        ("postcreate", "fan-out followers", Follow.objects.filter(
+            user_following=user
+        ).values_list("user", flat=True)),
+        ("student-by-name", "startswith",
+         Student.objects.filter(name__startswith="S")),
+    ]
+    if search.available():
+        matching = RawSQL(*search.matching_ids_sql(
+            search.name_prefix_query("S")
+        ))
+        queries.append(("student-by-name", "search index",
+                        Student.objects.filter(name__startswith="S",
+                                               id__in=matching)))
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the database query plan for the query behind each hot "
+        "endpoint, to check which index it uses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sql", action="store_true",
+                            help="Print the SQL of each query as well.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"database: {connection.vendor}")
+        for endpoint, label, queryset in hot_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{endpoint}: {label}"
+            ))
+            if options["sql"]:
+                self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
@@ -0,0 +1,56 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import User
+from core import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a user's profile, posts, comments, likes and follows as "
+        "NDJSON, one row per line, to stdout or a file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("user", help="User id or email.")
+        parser.add_argument("--output", "-o",
+                            help="File to write (default: stdout).")
+        parser.add_argument("--gzip", action="store_true",
+                            help="Compress the output; implied by a .gz "
+                                 "--output.")
+        parser.add_argument("--chunk-size", type=int,
+                            default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = options["user"]
+        lookup = {"email": user} if "@" in user else {"pk": user}
+        user_id = User.objects.filter(**lookup).values_list(
+            "pk", flat=True
+        ).first()
+        if user_id is None:
+            raise CommandError(f"No user {user}.")
+
+        output = options["output"]
+        pieces = export.lines(user_id, options["chunk_size"])
+        if options["gzip"] or (output or "").endswith(".gz"):
+            pieces = export.gzipped(pieces)
+
+        start = time.perf_counter()
+        written = 0
+        stream = open(output, "wb") if output else sys.stdout.buffer
+        try:
+            for piece in pieces:
+                stream.write(piece)
+                written += len(piece)
+        finally:
+            if output:
+                stream.close()
+            else:
+                stream.flush()
+        if output:
+            self.stdout.write(
+                f"Wrote {written} bytes to {output} in "
+                f"{time.perf_counter() - start:.2f}s."
+            )
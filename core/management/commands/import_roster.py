@@ -0,0 +1,84 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import roster
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports teachers, courses, students and enrolments from CSV or "
+        "NDJSON files in batches, upserting students on roll or email. "
+        "With --checkpoint an interrupted import resumes after its last "
+        "committed batch."
+    )
+
+    def add_arguments(self, parser):
+        for kind in roster.KINDS:
+            parser.add_argument(
+                f"--{kind}", metavar="FILE",
+                help=f"{kind.capitalize()} file, .csv or NDJSON.",
+            )
+        parser.add_argument(
+            "--batch-size", type=int, default=roster.BATCH_SIZE,
+            help=f"Records written per transaction "
+                 f"(default: {roster.BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--checkpoint", metavar="FILE",
+            help="Records the records imported from each file after every "
+                 "batch, and skips them when run again. Removed once the "
+                 "import finishes.",
+        )
+
+    def handle(self, *args, **options):
+        files = [(kind, options[kind]) for kind in roster.KINDS
+                 if options[kind]]
+        if not files:
+            raise CommandError(
+                "Give at least one of "
+                + ", ".join(f"--{kind}" for kind in roster.KINDS) + "."
+            )
+        checkpoint = options["checkpoint"]
+        done = {}
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as file:
+                done = json.load(file)
+
+        importer = roster.Importer()
+        for kind, path in files:
+            write = getattr(importer, f"import_{kind}")
+            totals = {"created": 0, "updated": 0, "skipped": 0}
+            read = resumed = done.get(kind, 0)
+            start = time.perf_counter()
+            for batch in roster.batches(roster.records(path, skip=read),
+                                        options["batch_size"]):
+                with transaction.atomic():
+                    counts = write(batch)
+                read += len(batch)
+                for key, value in counts.items():
+                    totals[key] += value
+                if checkpoint:
+                    done[kind] = read
+                    self.save(checkpoint, done)
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"{kind}: {read} records read.")
+            elapsed = time.perf_counter() - start
+            records = read - resumed
+            self.stdout.write(
+                f"{kind}: {totals['created']} created, "
+                f"{totals['updated']} updated, {totals['skipped']} skipped; "
+                f"{records} records in {elapsed:.2f}s "
+                f"({records / max(elapsed, 1e-9):.0f} records/s)."
+            )
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+    def save(self, path, done):
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(done, file)
+        os.replace(temporary, path)
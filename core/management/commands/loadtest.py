@@ -0,0 +1,119 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a dataset and drives every route in core.urls and "
+        "authentication.urls, reporting throughput, p50/p95/p99 latency "
+        "and SQL queries per request for each. Requests go through the "
+        "WSGI handler in-process, or to a running server with --url; that "
+        "server must use the same database and SECRET_KEY, since the "
+        "dataset and tokens are created locally. Seeded rows are deleted "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", choices=sorted(loadtest.SIZES),
+                            default="small")
+        parser.add_argument("--requests", type=int, default=100,
+                            help="Measured requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--url",
+                            help="Base URL of a running server, e.g. "
+                                 "http://127.0.0.1:8000.")
+        parser.add_argument("--only", action="append",
+                            help="Only endpoints whose path contains this "
+                                 "text. May be repeated.")
+        parser.add_argument("--output", help="Write results as JSON here.")
+        parser.add_argument("--baseline",
+                            help="JSON results to compare against.")
+        parser.add_argument("--threshold", type=float, default=0.10,
+                            help="p95 growth counted as a regression "
+                                 "(default: 0.10).")
+        parser.add_argument("--fail-on-regression", action="store_true")
+        parser.add_argument("--allow-non-test-database",
+                            action="store_true",
+                            help="Seed and drive a database whose name "
+                                 "does not start with test_ (e.g. a live "
+                                 "server's). Refused by default.")
+
+    def handle(self, *args, **options):
+        if not (loadtest.is_test_database()
+                or options["allow_non_test_database"]):
+            raise CommandError(
+                "The default database is not a test database; the load "
+                "test writes and deletes rows in it. Point DATABASES at a "
+                "test_ database or pass --allow-non-test-database."
+            )
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        if options["url"]:
+            transport = loadtest.HTTPTransport(options["url"])
+        else:
+            transport = loadtest.WSGITransport()
+
+        self.stdout.write(
+            f"{'endpoint':<44} {'req/s':>8} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'queries':>7} {'errors':>6}"
+        )
+        # The test client sends Host: testserver.
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+        ):
+            results = loadtest.run(
+                transport, options["size"], options["requests"],
+                options["concurrency"], options["warmup"],
+                only=options["only"], log=self.log,
+            )
+        for name in results["skipped"]:
+            self.stderr.write(f"No scenario for {name}, skipped.")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            self.report(baseline, results, options)
+
+    def log(self, name, result):
+        latency = result["latency_ms"]
+        queries = result["queries_per_request"]
+        self.stdout.write(
+            f"{result['method'] + ' ' + name:<44} "
+            f"{result['throughput_rps']:>8.1f} {latency['p50']:>8.2f} "
+            f"{latency['p95']:>8.2f} {latency['p99']:>8.2f} "
+            f"{'-' if queries is None else queries:>7} "
+            f"{result['errors']:>6}"
+        )
+
+    def report(self, baseline, results, options):
+        rows = loadtest.compare(baseline, results, options["threshold"])
+        self.stdout.write(
+            f"\n{'endpoint':<44} {'p95 base':>9} {'p95 now':>9} "
+            f"{'p95':>7} {'req/s':>7} {'queries':>11}"
+        )
+        regressions = 0
+        for (name, old_p95, new_p95, p95_change, rps_change, old_queries,
+             new_queries, regressed) in rows:
+            line = (
+                f"{name:<44} {old_p95:>9.2f} {new_p95:>9.2f} "
+                f"{p95_change:>+7.0%} {rps_change:>+7.0%} "
+                f"{str(old_queries) + '->' + str(new_queries):>11}"
+            )
+            if regressed:
+                regressions += 1
+                line = self.style.ERROR(line + "  REGRESSION")
+            self.stdout.write(line)
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{regressions} endpoints regressed.")
@@ -0,0 +1,56 @@
+from io import StringIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows the profiles written by ProfilingMiddleware: per view and "
+        "route, the number of sampled requests, time spent under the ORM, "
+        "serializers and renderers, and the top functions by cumulative "
+        "time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("endpoints", nargs="*",
+                            help="View names to show, every route of "
+                                 "each (default: all).")
+        parser.add_argument("--dir", default=profiling.PROFILE_DIR)
+        parser.add_argument("--limit", type=int, default=15)
+        parser.add_argument("--sort", default="cumulative",
+                            choices=["cumulative", "tottime", "calls"])
+
+    def handle(self, *args, **options):
+        # Profiles taken in this process since its last flush.
+        profiling.store.flush()
+        profiles = profiling.load(options["dir"])
+        if not profiles:
+            raise CommandError(f"No profiles in {options['dir']}.")
+        names = sorted(profiles)
+        for view_name in options["endpoints"]:
+            if not any(name.split(" ")[0] == view_name for name in names):
+                self.stderr.write(f"No profile for {view_name}.")
+        if options["endpoints"]:
+            names = [name for name in names
+                     if name.split(" ")[0] in options["endpoints"]]
+
+        for name in names:
+            stats = profiles[name]
+            requests = profiling.requests_in(stats, "profiled_request")
+            per_request = stats.total_tt / requests if requests else 0.0
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{name}: {requests} requests, "
+                f"{per_request * 1000:.2f} ms each"
+            ))
+            for label, seconds in profiling.layers(stats):
+                share = seconds / stats.total_tt if stats.total_tt else 0.0
+                self.stdout.write(
+                    f"  {label:<11} {seconds * 1000:>10.2f} ms {share:>6.1%}"
+                )
+            # pstats prints in fragments; OutputWrapper would end each one
+            # with a newline.
+            stats.stream = StringIO()
+            stats.sort_stats(options["sort"]).print_stats(options["limit"])
+            self.stdout.write(stats.stream.getvalue())
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import search
+from core.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the student search index from the student, course and "
+        "enrolment tables, e.g. after writes that skipped model signals."
+    )
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError(
+                "The student search index needs SQLite with FTS5."
+            )
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(f"Indexed {Student.objects.count()} students.")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import RECOUNTERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the denormalized like/comment/follow/post counters "
+        "and the core_tablecount rows in primary key order, one chunk per "
+        "transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Rows recomputed per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--only", choices=sorted(RECOUNTERS), action="append",
+            help="Restrict to posts, tables or users; may be repeated.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        for name in options["only"] or sorted(RECOUNTERS):
+            model, recount = RECOUNTERS[name]
+            total = 0
+            last_pk = None
+            while True:
+                pks = model.objects.order_by("pk")
+                if last_pk is not None:
+                    pks = pks.filter(pk__gt=last_pk)
+                pks = list(pks.values_list("pk", flat=True)[:chunk_size])
+                if not pks:
+                    break
+                with transaction.atomic():
+                    recount(model.objects.filter(pk__in=pks))
+                total += len(pks)
+                last_pk = pks[-1]
+            self.stdout.write(f"Reconciled {total} {name}.")
@@ -0,0 +1,242 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+from core.cache import stats as cache_stats
+
+# "memory" keeps the metrics of each process to itself. "file" writes
+# them to METRICS_DIR/<pid>.json at most every FLUSH_INTERVAL seconds and
+# the metrics endpoint sums every file, so any worker can be scraped.
+MODE = getattr(settings, "METRICS_MODE", "memory")
+METRICS_DIR = Path(getattr(settings, "METRICS_DIR",
+                           Path(settings.BASE_DIR) / "metrics"))
+FLUSH_INTERVAL = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+TOKEN = getattr(settings, "METRICS_TOKEN", "")
+ALLOWED_IPS = getattr(settings, "METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help)
+FAMILIES = {
+    "http_requests_total": (
+        "counter", "Requests served, by route, method and status."),
+    "http_request_duration_seconds": (
+        "histogram", "Time spent producing a response, by route, method "
+        "and status."),
+    "db_queries_total": (
+        "counter", "Database queries run while serving requests, by route."),
+    "db_query_seconds_total": (
+        "counter", "Time spent in database queries, by route."),
+    "cache_hits_total": ("counter", "Cache lookups that found an entry."),
+    "cache_misses_total": ("counter", "Cache lookups that found nothing."),
+    "cache_evictions_total": (
+        "counter", "Entries culled to stay under MAX_ENTRIES."),
+    "cache_invalidations_total": (
+        "counter", "Entries dropped because their data changed."),
+    "cache_hit_ratio": ("gauge", "Hits over lookups since the start."),
+}
+
+
+class QueryTally:
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# The tally of the request being served. sync_to_async copies the context,
+# so the queries of async views and of sync views under ASGI land in it too.
+current_tally = ContextVar("current_tally", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection by core.signals. It
+    only counts while a request has set current_tally.
+    """
+    tally = current_tally.get()
+    if tally is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tally.duration += time.perf_counter() - start
+        tally.count += 1
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """
+    Counters and histograms of this process, keyed by (name, labels).
+    Histogram buckets are stored per bucket and only made cumulative when
+    rendered.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.flushed = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] += amount
+
+    def observe(self, name, labels, value):
+        key = (name, label_key(labels))
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [
+                    [0] * len(self.buckets), 0.0, 0,
+                ]
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self):
+        """This process's metrics, cache stats included, as plain JSON."""
+        with self.lock:
+            counters = [[name, labels, value]
+                        for (name, labels), value in self.counters.items()]
+            histograms = [[name, labels, list(buckets), total, count]
+                          for (name, labels), (buckets, total, count)
+                          in self.histograms.items()]
+        for key, value in list(cache_stats.items()):
+            cache, event = key.rsplit(".", 1)
+            counters.append([f"cache_{event}_total", [["cache", cache]],
+                             value])
+        return {"counters": counters, "histograms": histograms}
+
+    def flush(self):
+        # Another thread flushing has the same data; no need to wait.
+        if not self.flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.flushed = time.monotonic()
+            METRICS_DIR.mkdir(parents=True, exist_ok=True)
+            path = METRICS_DIR / f"{os.getpid()}.json"
+            temporary = path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(self.snapshot()))
+            os.replace(temporary, path)
+        finally:
+            self.flush_lock.release()
+
+    def maybe_flush(self):
+        if MODE == "file" and (
+            time.monotonic() - self.flushed >= FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def collect(self):
+        """Snapshots of every process in file mode, else of this one."""
+        if MODE != "file":
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in METRICS_DIR.glob("*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+registry = Registry()
+if MODE == "file":
+    atexit.register(registry.flush)
+
+
+def merge(snapshots):
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            counters[name, label_key(dict(labels))] += value
+        for name, labels, buckets, total, count in snapshot["histograms"]:
+            key = (name, label_key(dict(labels)))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+    return counters, histograms
+
+
+def hit_ratios(counters):
+    lookups = defaultdict(lambda: [0, 0])
+    for (name, labels), value in counters.items():
+        if name in ("cache_hits_total", "cache_misses_total"):
+            lookups[labels][name == "cache_misses_total"] += value
+    return {labels: hits / (hits + misses)
+            for labels, (hits, misses) in lookups.items() if hits + misses}
+
+
+def escape(value):
+    return (str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"))
+
+
+def sample(name, labels, value):
+    rendered = ",".join(f'{key}="{escape(item)}"' for key, item in labels)
+    if float(value).is_integer():
+        value = int(value)
+    return f"{name}{{{rendered}}} {value}" if rendered else f"{name} {value}"
+
+
+def may_scrape(request):
+    if TOKEN:
+        return constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {TOKEN}"
+        )
+    return request.META.get("REMOTE_ADDR") in ALLOWED_IPS
+
+
+def render(snapshots, buckets=BUCKETS):
+    """Merges snapshots into the Prometheus text exposition format."""
+    counters, histograms = merge(snapshots)
+    families = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()):
+        families[name].append(sample(name, labels, value))
+    for labels, ratio in sorted(hit_ratios(counters).items()):
+        families["cache_hit_ratio"].append(
+            sample("cache_hit_ratio", labels, ratio)
+        )
+    for (name, labels), (counts, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, bucket in zip(buckets, counts):
+            cumulative += bucket
+            families[name].append(sample(
+                f"{name}_bucket", labels + (("le", repr(bound)),), cumulative
+            ))
+        families[name].append(
+            sample(f"{name}_bucket", labels + (("le", "+Inf"),), count)
+        )
+        families[name].append(sample(f"{name}_sum", labels, total))
+        families[name].append(sample(f"{name}_count", labels, count))
+
+    lines = []
+    for name, samples in families.items():
+        kind, description = FAMILIES.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
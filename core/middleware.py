@@ -0,0 +1,216 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics, profiling
+
+logger = logging.getLogger("core.sql")
+
+# Fraction of requests that are instrumented; the rest pass straight
+# through.
+SAMPLE_RATE = getattr(settings, "SQL_INSTRUMENTATION_SAMPLE_RATE", 0.1)
+# A query shape run more often than this in one request is logged as a
+# likely N+1.
+REPEAT_THRESHOLD = getattr(settings, "SQL_REPEAT_THRESHOLD", 10)
+
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+NUMBER = re.compile(r"\b\d+\b")
+QUOTED = re.compile(r"'(?:[^']|'')*'")
+
+
+def normalize(sql):
+    """Collapses literals and IN lists so that repeats of a query match."""
+    sql = QUOTED.sub("?", sql)
+    sql = IN_LIST.sub("IN (...)", sql)
+    return NUMBER.sub("?", sql)
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() hook that counts and times queries.
+    Raw SQL strings are counted as they run; normalizing them is left to
+    repeated(), once per distinct string.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        shapes = Counter()
+        for sql, total in self.statements.items():
+            shapes[normalize(sql)] += total
+        return [(shape, total) for shape, total in shapes.most_common()
+                if total > threshold]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records the queries of a sampled fraction of requests on every
+    database connection, without needing DEBUG. The totals are sent back
+    in a Server-Timing header, and query shapes repeated more than
+    REPEAT_THRESHOLD times are logged to "core.sql" as a warning.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= SAMPLE_RATE:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= SAMPLE_RATE:
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        # Connections are per thread. Sync views and the async ORM run
+        # their queries on the request's thread-sensitive worker, so the
+        # wrappers are installed and removed there.
+        stack = await sync_to_async(self.recording)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def recording(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def report(self, request, response, recorder, elapsed):
+        response["Server-Timing"] = (
+            f'db;dur={recorder.duration * 1000:.3f};'
+            f'desc="{recorder.count} queries", '
+            f"total;dur={elapsed * 1000:.3f}"
+        )
+        for shape, total in recorder.repeated(REPEAT_THRESHOLD):
+            logger.warning(
+                "Possible N+1: %s %s ran %d times: %s",
+                request.method, request.path, total, shape,
+            )
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Runs a sampled share of requests per URL name under cProfile and adds
+    the result to core.profiling.store, by view name and route. Put it
+    last in MIDDLEWARE: it calls the view itself and renders the response,
+    so view, serializer, ORM and rendering time all land in the profile.
+
+    Async views are skipped, since cProfile only follows the thread it was
+    started on.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        rate = profiling.rate_for(match.url_name)
+        if not rate or random.random() >= rate:
+            return None
+        if iscoroutinefunction(view_func):
+            return None
+        response, profile = profiling.profile_call(
+            self.profiled_request, request, view_func, view_args,
+            view_kwargs,
+        )
+        profiling.store.add(profiling.endpoint(match), profile)
+        return response
+
+    def profiled_request(self, request, view_func, view_args, view_kwargs):
+        response = view_func(request, *view_args, **view_kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            response = response.render()
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Counts every request into core.metrics.registry: requests and latency
+    by route, method and status, plus the queries each route ran. Put it
+    first in MIDDLEWARE so the latency covers the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        tally = metrics.QueryTally()
+        token = metrics.current_tally.set(tally)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_tally.reset(token)
+        self.record(request, response, tally, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        tally = metrics.QueryTally()
+        token = metrics.current_tally.set(tally)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_tally.reset(token)
+        self.record(request, response, tally, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, tally, elapsed):
+        match = request.resolver_match
+        route = match.route if match else "unmatched"
+        labels = {"route": route, "method": request.method,
+                  "status": str(response.status_code)}
+        registry = metrics.registry
+        registry.inc("http_requests_total", labels)
+        registry.observe("http_request_duration_seconds", labels, elapsed)
+        registry.inc("db_queries_total", {"route": route}, tally.count)
+        registry.inc("db_query_seconds_total", {"route": route},
+                     tally.duration)
+        registry.maybe_flush()
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.15 on 2026-10-17 22:10
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("core", "Post")
+    Like = apps.get_model("core", "Like")
+    Comment = apps.get_model("core", "Comment")
+    Follow = apps.get_model("core", "Follow")
+    User = apps.get_model("authentication", "User")
+
+    Post.objects.update(
+        likes_count=count_of(Like, "post"),
+        comments_count=count_of(Comment, "post"),
+    )
+    User.objects.update(
+        followers_count=count_of(Follow, "user_following"),
+        following_count=count_of(Follow, "user"),
+        posts_count=count_of(Post, "user"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_counters'),
+        ('core', '0002_course_teacher_student_course_teacher'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
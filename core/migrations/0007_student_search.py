@@ -0,0 +1,49 @@
+from django.db import migrations, OperationalError
+
+# Student ids with their name, email, roll and course names; mirrors
+# core.search.DOCUMENTS.
+DOCUMENTS = """
+    SELECT s.id, s.name, s.email, s.roll, COALESCE((
+        SELECT group_concat(c.name, ' ')
+        FROM core_student_courses sc
+        JOIN core_course c ON c.id = sc.course_id
+        WHERE sc.student_id = s.id
+    ), '')
+    FROM core_student s
+"""
+
+
+def create_search_table(apps, schema_editor):
+    # Other databases, and SQLite builds without FTS5, go without the
+    # index; core.search.available() reports False and the views fall
+    # back to plain queries.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE core_student_search USING fts5("
+                "name, email, roll, courses, prefix='2 3')"
+            )
+        except OperationalError:
+            return
+        cursor.execute(
+            "INSERT INTO core_student_search(rowid, name, email, roll, "
+            f"courses) {DOCUMENTS}"
+        )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS core_student_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.15 on 2026-10-17 22:53
+
+from django.db import migrations, models
+
+# Tables whose row count core.counts serves from core_tablecount.
+TABLES = ["core_student", "core_post", "core_like", "core_comment",
+          "core_follow"]
+
+
+def install_triggers(apps, schema_editor):
+    # Without triggers core.counts falls back to COUNT(*).
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f"INSERT INTO core_tablecount (name, total) "
+            f"SELECT '{table}', COUNT(*) FROM {table}"
+        )
+        for event, delta in (("INSERT", "+ 1"), ("DELETE", "- 1")):
+            schema_editor.execute(
+                f"CREATE TRIGGER {table}_count_{event.lower()} "
+                f"AFTER {event} ON {table} BEGIN "
+                f"UPDATE core_tablecount SET total = total {delta} "
+                f"WHERE name = '{table}'; END"
+            )
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table in TABLES:
+        for event in ("insert", "delete"):
+            schema_editor.execute(
+                f"DROP TRIGGER IF EXISTS {table}_count_{event}"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_student_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableCount',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(install_triggers, drop_triggers),
+    ]
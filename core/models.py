@@ -1,11 +1,25 @@
 import uuid
 
 from django.db import models
+from django.db.models import Prefetch
+from django.db.models.functions import Collate
 
 # from django.contrib.auth.models import User
 from authentication.models import User
 
 
+class PostQuerySet(models.QuerySet):
+    def with_engagement(self):
+        """
+        Joins the author and prefetches likes/comments so PostGetSerializer
+        can render a page of posts in a fixed number of queries.
+        """
+        return self.select_related("user").prefetch_related(
+            Prefetch("comment_set", queryset=Comment.objects.all()),
+            Prefetch("like_set", queryset=Like.objects.all()),
+        )
+
+
 class Post(models.Model):
     uuid = models.UUIDField(primary_key=True, default=uuid.uuid4,
                             editable=False)
@@ -13,6 +27,21 @@ class Post(models.Model):
     title = models.CharField(max_length=30)
     content = models.CharField(max_length=500)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized counters, see core.counters.
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order, see core.CustomPagination.
+            models.Index(fields=["created_at", "uuid"],
+                         name="core_post_created_uuid_idx"),
+            # A user's posts newest first: feed backfill and pull.
+            models.Index(fields=["user", "created_at", "uuid"],
+                         name="core_post_user_created_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -21,6 +50,7 @@ class Post(models.Model):
 class BaseLikeComment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         abstract = True
@@ -35,6 +65,10 @@ class Like(BaseLikeComment):
             "user",
             "post",
         )
+        indexes = [
+            models.Index(fields=["created_at", "uuid"],
+                         name="core_like_created_uuid_idx"),
+        ]
 
     def __str__(self):
         return str(self.user)
@@ -45,6 +79,15 @@ class Comment(BaseLikeComment):
                             editable=False)
     comment = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            # Keyset pages of a post's or a user's comments.
+            models.Index(fields=["post", "created_at", "uuid"],
+                         name="core_comment_post_created_idx"),
+            models.Index(fields=["user", "created_at", "uuid"],
+                         name="core_comment_user_created_idx"),
+        ]
+
     def __str__(self):
         return str(self.user)
 
@@ -62,12 +105,24 @@ class Follow(models.Model):
     user_following = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="user_following"
     )
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = (
             "user",
             "user_following",
         )
+        indexes = [
+            # Covers follower id lookups (fan-out, follow graph) without
+            # touching the table.
+            models.Index(fields=["user_following", "user"],
+                         name="core_follow_following_idx"),
+            # Keyset pages of a user's followers and followings.
+            models.Index(fields=["user_following", "created_at", "uuid"],
+                         name="core_follow_followers_page_idx"),
+            models.Index(fields=["user", "created_at", "uuid"],
+                         name="core_follow_following_page_idx"),
+        ]
 
     def __str__(self):
         return str(self.user)
@@ -89,6 +144,17 @@ class Course(models.Model):
         return self.name
 
 
+class StudentQuerySet(models.QuerySet):
+    def with_courses(self):
+        """
+        Prefetches the course ids StudentSerializer renders, so a list of
+        students costs two queries whatever its length.
+        """
+        return self.prefetch_related(
+            Prefetch("courses", queryset=Course.objects.only("id"))
+        )
+
+
 class Student(models.Model):
     name = models.CharField(max_length=100)
     roll = models.CharField(max_length=20, unique=True)
@@ -96,5 +162,54 @@ class Student(models.Model):
     email = models.EmailField(unique=True)
     courses = models.ManyToManyField(Course, related_name='students')
 
+    objects = StudentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # SQLite only uses an index for LIKE 'x%' (startswith) when
+            # the index collation matches LIKE's case-insensitive one.
+            models.Index(Collate("name", "NOCASE"),
+                         name="core_student_name_idx"),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class TimelineEntry(models.Model):
+    """
+    One row per (follower, post) in a follower's home timeline, written
+    when the post is created. created_at is copied from the post so a
+    feed page is a single range scan on (owner, created_at, post).
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE,
+                              related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = (
+            "owner",
+            "post",
+        )
+        indexes = [
+            models.Index(fields=["owner", "created_at", "post"],
+                         name="core_timeline_owner_idx"),
+        ]
+
+    def __str__(self):
+        return str(self.owner)
+
+
+class TableCount(models.Model):
+    """
+    Row count of a table, keyed by its db_table. On SQLite, triggers
+    installed by migration 0008_table_counts keep it exact on every
+    insert and delete, bulk and raw SQL writes included; a migration that
+    rebuilds the table drops them, see core.counts.missing_triggers().
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    total = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.total}"
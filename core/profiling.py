@@ -0,0 +1,137 @@
+import atexit
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+
+# Share of requests profiled per URL name, with "*" for the rest. Empty
+# turns profiling off.
+SAMPLE_RATES = getattr(settings, "PROFILE_SAMPLE_RATES", {})
+PROFILE_DIR = Path(getattr(settings, "PROFILE_DIR",
+                           Path(settings.BASE_DIR) / "profiles"))
+# Seconds between writes of the aggregated profiles to PROFILE_DIR.
+FLUSH_INTERVAL = getattr(settings, "PROFILE_FLUSH_INTERVAL", 10.0)
+
+# (label, file suffix, function name): cumulative time under the
+# outermost matching frame. Layers nest, e.g. lazy queries made while
+# serializing count towards both serializer and orm.
+LAYERS = [
+    ("orm", os.path.join("django", "db", "models", "sql", "compiler.py"),
+     "execute_sql"),
+    ("serializer", os.path.join("rest_framework", "serializers.py"),
+     "to_representation"),
+    ("render", "renderers.py", "render"),
+]
+
+
+def rate_for(url_name):
+    return SAMPLE_RATES.get(url_name, SAMPLE_RATES.get("*", 0.0))
+
+
+def endpoint(resolver_match):
+    """
+    "<view name> <route>": URL names are reused across views, e.g.
+    student-by-name, so the route tells them apart.
+    """
+    return f"{resolver_match.view_name} {resolver_match.route}"
+
+
+def dump_path(key):
+    # Routes contain slashes.
+    return PROFILE_DIR / f"{quote(key, safe='')}.{os.getpid()}.pstats"
+
+
+class ProfileStore:
+    """
+    Per-endpoint pstats aggregated in memory and written to
+    PROFILE_DIR/<endpoint>.<pid>.pstats at most every FLUSH_INTERVAL
+    seconds and at exit, so several worker processes never write the same
+    file and sampled requests rarely pay for a write.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stats = {}
+        self.dirty = set()
+        self.flushed = time.monotonic()
+
+    def add(self, key, profile):
+        profile.create_stats()
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                self.stats[key] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self.dirty.add(key)
+        self.maybe_flush()
+
+    def flush(self):
+        # Another thread flushing writes the same data; no need to wait.
+        if not self.flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.flushed = time.monotonic()
+            with self.lock:
+                dumps = {key: marshal.dumps(self.stats[key].stats)
+                         for key in self.dirty}
+                self.dirty.clear()
+            if dumps:
+                PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            for key, data in dumps.items():
+                path = dump_path(key)
+                temporary = path.with_suffix(".tmp")
+                temporary.write_bytes(data)
+                os.replace(temporary, path)
+        finally:
+            self.flush_lock.release()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed >= FLUSH_INTERVAL:
+            self.flush()
+
+
+store = ProfileStore()
+atexit.register(store.flush)
+
+
+def profile_call(func, *args, **kwargs):
+    """Runs func under a new cProfile.Profile and returns both."""
+    profile = cProfile.Profile()
+    return profile.runcall(func, *args, **kwargs), profile
+
+
+def load(directory=PROFILE_DIR):
+    """{endpoint: pstats.Stats} merged across processes."""
+    files = {}
+    for path in sorted(Path(directory).glob("*.pstats")):
+        key = unquote(path.name.rsplit(".", 2)[0])
+        files.setdefault(key, []).append(str(path))
+    return {key: pstats.Stats(*paths) for key, paths in files.items()}
+
+
+def requests_in(stats, marker):
+    """Calls of the profiled entry point marker, i.e. sampled requests."""
+    for (filename, _, name), (_, calls, *_) in stats.stats.items():
+        if name == marker and filename.endswith("middleware.py"):
+            return calls
+    return 0
+
+
+def layers(stats):
+    """[(label, cumulative seconds)] for LAYERS, see above."""
+    result = []
+    for label, suffix, function in LAYERS:
+        cumulative = 0.0
+        for (filename, _, name), (_, _, _, ct, _) in stats.stats.items():
+            if name == function and filename.endswith(suffix):
+                cumulative = max(cumulative, ct)
+        result.append((label, cumulative))
+    return result
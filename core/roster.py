@@ -0,0 +1,181 @@
+"""
+Bulk import of teachers, courses, students and enrolments, behind
+`manage.py import_roster`.
+
+Records are read one at a time from CSV or NDJSON files and written with
+bulk_create()/bulk_update() a batch at a time, so memory is bounded by the
+batch size (plus the teacher and course names, which are few). Bulk writes
+skip model signals: the search index is updated here, and the
+core_tablecount triggers keep the table counts.
+
+Record fields, by kind:
+
+    teachers     name
+    courses      name, teacher (a teacher name, created if missing)
+    students     roll, email, name, address
+    enrollments  roll, course (a course name)
+
+Students are upserted with INSERT ... ON CONFLICT: a record updates the
+student with its roll, else the one with its email, and is skipped when
+those are two different students. Teachers and courses are matched by
+name and enrolments already present are skipped, so importing a file
+twice, or again from an earlier batch, is harmless.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from core import search
+from core.models import Course, Student, Teacher
+
+BATCH_SIZE = getattr(settings, "IMPORT_BATCH_SIZE", 5000)
+
+# In import order: courses need teachers, enrolments need both.
+KINDS = ("teachers", "courses", "students", "enrollments")
+
+STUDENT_FIELDS = ("roll", "email", "name", "address")
+
+
+def records(path, skip=0):
+    """The records of a .csv or NDJSON file as dicts, after the first skip."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        yield from islice(rows, skip, None)
+
+
+def batches(rows, size=None):
+    size = size or BATCH_SIZE
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def text(record, field):
+    value = record.get(field)
+    return "" if value is None else str(value).strip()
+
+
+class Importer:
+    """
+    Writes batches of records, keeping the teacher and course ids by name.
+    Each method returns {"created", "updated", "skipped"} counts; run each
+    batch in a transaction.
+    """
+
+    def __init__(self):
+        self.teachers = dict(Teacher.objects.values_list("name", "id"))
+        self.courses = {
+            name: (pk, teacher_id) for pk, name, teacher_id
+            in Course.objects.values_list("id", "name", "teacher_id")
+        }
+
+    def import_teachers(self, batch):
+        names = {text(record, "name") for record in batch} - {""}
+        new = [Teacher(name=name)
+               for name in sorted(names - self.teachers.keys())]
+        Teacher.objects.bulk_create(new)
+        self.teachers.update((teacher.name, teacher.pk) for teacher in new)
+        return {"created": len(new), "updated": 0,
+                "skipped": len(batch) - len(names)}
+
+    def import_courses(self, batch):
+        teachers = {}
+        for record in batch:
+            name = text(record, "name")
+            teacher = text(record, "teacher")
+            if name and teacher:
+                teachers[name] = teacher
+        self.import_teachers([{"name": name} for name in teachers.values()])
+
+        new, changed = [], []
+        for name, teacher in teachers.items():
+            teacher_id = self.teachers[teacher]
+            if name not in self.courses:
+                new.append(Course(name=name, teacher_id=teacher_id))
+            elif self.courses[name][1] != teacher_id:
+                changed.append(Course(pk=self.courses[name][0], name=name,
+                                      teacher_id=teacher_id))
+        Course.objects.bulk_create(new)
+        Course.objects.bulk_update(changed, ["teacher"])
+        self.courses.update((course.name, (course.pk, course.teacher_id))
+                            for course in new + changed)
+        return {"created": len(new), "updated": len(changed),
+                "skipped": len(batch) - len(teachers)}
+
+    def import_students(self, batch):
+        # The last record for a roll or an email wins.
+        latest = {}
+        for record in batch:
+            values = {field: text(record, field) for field in STUDENT_FIELDS}
+            if values["roll"] and values["email"]:
+                latest[values["roll"]] = values
+        rows = list({row["email"]: row for row in latest.values()}.values())
+
+        existing = Student.objects.filter(
+            Q(roll__in=[row["roll"] for row in rows])
+            | Q(email__in=[row["email"] for row in rows])
+        ).values_list("id", "roll", "email")
+        ids_by_roll, ids_by_email = {}, {}
+        for pk, roll, email in existing:
+            ids_by_roll[roll] = pk
+            ids_by_email[email] = pk
+
+        # Upserts on roll create or update by roll; the rest update by
+        # email. Both are single INSERT ... ON CONFLICT statements, far
+        # cheaper than bulk_update()'s CASE per row.
+        on_roll, on_email, claimed = [], [], set()
+        for row in rows:
+            by_roll = ids_by_roll.get(row["roll"])
+            by_email = ids_by_email.get(row["email"])
+            pk = by_roll or by_email
+            if by_email not in (None, pk) or pk in claimed:
+                # Its roll and email belong to different students.
+                continue
+            if pk is not None:
+                claimed.add(pk)
+            (on_roll if by_email is None or by_roll else on_email).append(
+                Student(**row)
+            )
+        for students, field in ((on_roll, "roll"), (on_email, "email")):
+            Student.objects.bulk_create(
+                students, update_conflicts=True, unique_fields=[field],
+                update_fields=[name for name in STUDENT_FIELDS
+                               if name != field],
+            )
+        written = on_roll + on_email
+        search.index_students(Student.objects.filter(
+            roll__in=[student.roll for student in written]
+        ).values_list("pk", flat=True))
+        return {"created": len(written) - len(claimed),
+                "updated": len(claimed),
+                "skipped": len(batch) - len(written)}
+
+    def import_enrollments(self, batch):
+        pairs = {(text(record, "roll"), text(record, "course"))
+                 for record in batch}
+        students = dict(Student.objects.filter(
+            roll__in={roll for roll, _ in pairs}
+        ).values_list("roll", "id"))
+        through = Student.courses.through
+        links = [
+            through(student_id=students[roll],
+                    course_id=self.courses[course][0])
+            for roll, course in pairs
+            if roll in students and course in self.courses
+        ]
+        before = through.objects.filter(
+            student_id__in=students.values()
+        ).count()
+        through.objects.bulk_create(links, ignore_conflicts=True)
+        created = through.objects.filter(
+            student_id__in=students.values()
+        ).count() - before
+        search.index_students(sorted({link.student_id for link in links}))
+        return {"created": created, "updated": 0,
+                "skipped": len(batch) - created}
@@ -0,0 +1,111 @@
+import re
+
+from django.db import connection
+
+# FTS5 table over Student, rowid = student id. Created by migration
+# 0007_student_search on SQLite builds with FTS5, kept in sync by
+# core.signals. Bulk writes that skip signals must call index_students().
+TABLE = "core_student_search"
+CHUNK = 500
+
+WORD = re.compile(r"\w+")
+
+DOCUMENTS = f"""
+    SELECT s.id, s.name, s.email, s.roll, COALESCE((
+        SELECT group_concat(c.name, ' ')
+        FROM core_student_courses sc
+        JOIN core_course c ON c.id = sc.course_id
+        WHERE sc.student_id = s.id
+    ), '')
+    FROM core_student s
+"""
+
+_available = {}
+
+
+def available():
+    """Whether the default database has the search table."""
+    key = (connection.alias, connection.settings_dict["NAME"])
+    if key not in _available:
+        _available[key] = (
+            connection.vendor == "sqlite"
+            and TABLE in connection.introspection.table_names()
+        )
+    return _available[key]
+
+
+def terms(text):
+    return WORD.findall(text or "")
+
+
+def prefix_query(text):
+    """
+    FTS5 query matching rows where every word of text starts a word in
+    any column, or None if text has no words.
+    """
+    words = terms(text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def name_prefix_query(text):
+    """
+    FTS5 query for names whose first words start like text. It matches a
+    superset of name__startswith=text; callers filter the rest out.
+    """
+    words = terms(text)
+    if not words:
+        return None
+    return f'name : ^"{" ".join(words)}"*'
+
+
+def matching_ids_sql(query):
+    """(sql, params) selecting the ids of the students matching query."""
+    return f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", [query]
+
+
+def ranked(query, position=None, reverse=False, limit=50):
+    """
+    [(rank, id)] of the students matching query, best first (bm25, lower
+    is better, then id). position is the (rank, id) of the last row seen.
+    """
+    sql = f"SELECT rank, rowid FROM {TABLE} WHERE {TABLE} MATCH %s"
+    params = [query]
+    if position is not None:
+        op = "<" if reverse else ">"
+        sql += f" AND (rank {op} %s OR (rank = %s AND rowid {op} %s))"
+        params += [position[0], position[0], position[1]]
+    order = "DESC" if reverse else "ASC"
+    sql += f" ORDER BY rank {order}, rowid {order} LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def index_students(ids):
+    """Rewrites the index rows of the given students from the tables."""
+    if not available():
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), CHUNK):
+            chunk = ids[start:start + CHUNK]
+            marks = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid IN ({marks})",
+                           chunk)
+            cursor.execute(
+                f"INSERT INTO {TABLE}(rowid, name, email, roll, courses) "
+                f"{DOCUMENTS} WHERE s.id IN ({marks})",
+                chunk,
+            )
+
+
+def rebuild():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(
+            f"INSERT INTO {TABLE}(rowid, name, email, roll, courses) "
+            f"{DOCUMENTS}"
+        )
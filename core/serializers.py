@@ -1,5 +1,9 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 
+from authentication.models import User
 from authentication.serializers import UserDataSerializer
 from core.models import Comment, Follow, Like, Post, Student, Course, Teacher
 
@@ -11,32 +15,6 @@ class PostSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class PostGetSerializer(serializers.ModelSerializer):
-    user = UserDataSerializer()
-    count_comments = serializers.SerializerMethodField()
-    count_likes = serializers.SerializerMethodField()
-    comments = serializers.SerializerMethodField()
-    likes = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Post
-        fields = "__all__"
-
-    def get_count_comments(self, obj):
-        return Comment.objects.filter(post__user=obj.user).count()
-
-    def get_count_likes(self, obj):
-        return Like.objects.filter(post__user=obj.user).count()
-
-    def get_comments(self, obj):
-        comments = Comment.objects.filter(post__user=obj.user)
-        return CommentSerializer(comments, many=True).data
-
-    def get_likes(self, obj):
-        comments = Like.objects.filter(post__user=obj.user)
-        return LikeSerializer(comments, many=True).data
-
-
 class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
@@ -50,6 +28,141 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class PostGetSerializer(serializers.ModelSerializer):
+    user = UserDataSerializer()
+    count_comments = serializers.IntegerField(source="comments_count",
+                                              read_only=True)
+    count_likes = serializers.IntegerField(source="likes_count",
+                                           read_only=True)
+    comments = CommentSerializer(source="comment_set", many=True,
+                                 read_only=True)
+    likes = LikeSerializer(source="like_set", many=True, read_only=True)
+
+    class Meta:
+        model = Post
+        exclude = ["comments_count", "likes_count"]
+
+
+NON_FIELD_ERRORS_KEY = api_settings.NON_FIELD_ERRORS_KEY
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves ids from
+    context["related_objects"][field_name] when BulkCreateListSerializer
+    has loaded them, instead of running one query per item.
+    """
+
+    def to_internal_value(self, data):
+        objects = self.context.get("related_objects", {}).get(self.field_name)
+        if objects is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail("does_not_exist", pk_value=data)
+        return objects[pk]
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    many=True serializer for the bulk create endpoints.
+
+    Items are validated independently: valid ones end up in
+    validated_data with their positions in valid_indices, and failures
+    are kept in item_errors by index, so one bad item does not reject the
+    batch.
+    Related objects are loaded with one query per relation up front.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages["not_a_list"].format(
+                input_type=type(data).__name__
+            )
+            raise ValidationError({NON_FIELD_ERRORS_KEY: [message]},
+                                  code="not_a_list")
+        if not data:
+            raise ValidationError(
+                {NON_FIELD_ERRORS_KEY: [self.error_messages["empty"]]},
+                code="empty",
+            )
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages["max_length"].format(
+                max_length=self.max_length
+            )
+            raise ValidationError({NON_FIELD_ERRORS_KEY: [message]},
+                                  code="max_length")
+
+        self.context["related_objects"] = self.load_related(data)
+        self.item_errors = {}
+        self.valid_indices = []
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append(self.run_child_validation(item))
+            except ValidationError as exc:
+                self.item_errors[index] = exc.detail
+            else:
+                self.valid_indices.append(index)
+        return validated
+
+    def load_related(self, data):
+        related = {}
+        for name, field in self.child.fields.items():
+            if not isinstance(field, CachedPrimaryKeyRelatedField):
+                continue
+            to_python = field.get_queryset().model._meta.pk.to_python
+            pks = set()
+            for item in data:
+                try:
+                    pks.add(to_python(item.get(name)))
+                except (AttributeError, DjangoValidationError,
+                        TypeError, ValueError):
+                    continue
+            pks.discard(None)
+            related[name] = field.get_queryset().in_bulk(pks)
+        return related
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        objs = [model(**attrs) for attrs in validated_data]
+        return model.objects.bulk_create(
+            objs, batch_size=500,
+            ignore_conflicts=getattr(self.child.Meta, "ignore_conflicts",
+                                     False),
+        )
+
+
+class PostBulkSerializer(PostSerializer):
+    user = CachedPrimaryKeyRelatedField(queryset=User.objects.all())
+
+    class Meta(PostSerializer.Meta):
+        list_serializer_class = BulkCreateListSerializer
+
+
+class CommentBulkSerializer(CommentSerializer):
+    user = CachedPrimaryKeyRelatedField(queryset=User.objects.all())
+    post = CachedPrimaryKeyRelatedField(queryset=Post.objects.all())
+
+    class Meta(CommentSerializer.Meta):
+        list_serializer_class = BulkCreateListSerializer
+
+
+class LikeBulkSerializer(LikeSerializer):
+    user = CachedPrimaryKeyRelatedField(queryset=User.objects.all())
+    post = CachedPrimaryKeyRelatedField(queryset=Post.objects.all())
+
+    class Meta(LikeSerializer.Meta):
+        list_serializer_class = BulkCreateListSerializer
+        # Duplicates are skipped by the INSERT against unique_together
+        # instead of one exists() query per item.
+        validators = []
+        ignore_conflicts = True
+
+
 class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         model = Follow
@@ -0,0 +1,76 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core import search
+from core.cache import post_cache
+from core.metrics import count_queries
+from core.models import Comment, Course, Like, Post, Student
+
+
+# Invalidate after commit so the counter updates made in the same
+# transaction are visible to whoever repopulates the entry.
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    transaction.on_commit(partial(post_cache.invalidate, instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Like)
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_post_of(sender, instance, **kwargs):
+    transaction.on_commit(partial(post_cache.invalidate, instance.post_id))
+
+
+# The search index is written in the same transaction as the rows it
+# mirrors, so a rollback undoes both.
+@receiver([post_save, post_delete], sender=Student)
+def index_student(sender, instance, **kwargs):
+    search.index_students([instance.pk])
+
+
+@receiver(m2m_changed, sender=Student.courses.through)
+def index_enrolment(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._search_students = list(
+            instance.students.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        search.index_students(
+            instance._search_students if reverse else [instance.pk]
+        )
+    elif action in ("post_add", "post_remove"):
+        search.index_students(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, created, **kwargs):
+    if not created:
+        search.index_students(instance.students.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Course)
+def remember_course_students(sender, instance, **kwargs):
+    instance._search_students = list(
+        instance.students.values_list("pk", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Course)
+def index_course_students(sender, instance, **kwargs):
+    search.index_students(instance._search_students)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # First in the list, so execute_wrapper() blocks, which pop the last
+    # wrapper on exit, never remove it. Reconnects reuse the same list.
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
@@ -0,0 +1,90 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from authentication.renderers import FastJSONRenderer
+
+# Rows read, serialized and sent per piece of a streamed response.
+CHUNK_SIZE = getattr(settings, "STREAM_CHUNK_SIZE", 1000)
+
+FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+renderer = FastJSONRenderer()
+
+
+def encoded_chunks(queryset, serializer_class, ndjson, chunk_size=None):
+    """
+    The serialized queryset as bytes, one piece per chunk_size rows: a
+    JSON array, or one JSON object per line when ndjson is set. Only one
+    chunk of rows and its output are held at a time; prefetches run per
+    chunk.
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    rows = queryset.iterator(chunk_size=chunk_size)
+    if not ndjson:
+        yield b"["
+    separator = b""
+    while chunk := list(islice(rows, chunk_size)):
+        data = serializer_class(chunk, many=True).data
+        if ndjson:
+            yield b"".join(renderer.encode(row) + b"\n" for row in data)
+        else:
+            # Encoding the chunk as a list and dropping the brackets
+            # leaves its rows comma separated.
+            yield separator + renderer.encode(data)[1:-1]
+            separator = b","
+    if not ndjson:
+        yield b"]"
+
+
+async def aiterate(iterator):
+    """
+    Steps a sync iterator that reads the database from async code. Under
+    ASGI a sync iterator would be read to the end before sending.
+    """
+    step = sync_to_async(next)
+    while (piece := await step(iterator, None)) is not None:
+        yield piece
+
+
+def streaming_response(request, chunks, **kwargs):
+    """StreamingHttpResponse of chunks, stepped with aiterate() under ASGI."""
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        chunks = aiterate(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+def stream(request, queryset, serializer_class, format):
+    chunks = encoded_chunks(queryset, serializer_class, format == "ndjson")
+    return streaming_response(request, chunks, content_type=FORMATS[format])
+
+
+class StreamingListMixin:
+    """
+    For APIViews that return a whole list. With ?stream=json or
+    ?stream=ndjson the rows are serialized and sent as they are read, so
+    memory stays flat however many rows match. Headers go out before the
+    rows, so an error halfway through truncates the body.
+    """
+
+    stream_query_param = "stream"
+
+    def list_response(self, queryset, serializer_class):
+        format = self.request.query_params.get(self.stream_query_param)
+        if format is None:
+            serializer = serializer_class(queryset, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        if format not in FORMATS:
+            return Response(
+                {"errors": {"msg": "stream must be json or ndjson"}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return stream(self.request, queryset, serializer_class, format)
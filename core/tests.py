@@ -1 +1,1120 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core import checks
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from SocialApp.sqlite.base import DatabaseWrapper
+from authentication.models import User
+from core import counts, export, loadtest, metrics, profiling, roster, search
+from core.cache import stats
+from core.graph import FollowGraph
+from core.middleware import normalize
+from core.models import (
+    Comment,
+    Course,
+    Follow,
+    Like,
+    Post,
+    Student,
+    StudentQuerySet,
+    Teacher,
+    TimelineEntry,
+)
+from core.views import LikeBulkCreateAPIView
+
+
+def make_user(email):
+    return User.objects.create_user(
+        email=email, first_name="Test", last_name="User", gender="M",
+        password="pass12345",
+    )
+
+
+class PostReadPathTests(TestCase):
+    def setUp(self):
+        self.user = make_user("author@example.com")
+        self.other = make_user("reader@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_posts(self, total):
+        for i in range(total):
+            post = Post.objects.create(user=self.user, title=f"post {i}",
+                                       content="content")
+            Comment.objects.create(user=self.other, post=post, comment="hi")
+            Like.objects.create(user=self.other, post=post)
+
+    def test_post_list_query_count_is_constant(self):
+        self.create_posts(20)
+        # page of posts (+ author join), comments, likes
+        for limit in (1, 5, 20):
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse("postlist"),
+                                           {"limit": limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["results"]), limit)
+
+    def test_counts_are_scoped_per_post(self):
+        first = Post.objects.create(user=self.user, title="a", content="a")
+        second = Post.objects.create(user=self.user, title="b", content="b")
+        Comment.objects.create(user=self.other, post=first, comment="one")
+        Comment.objects.create(user=self.user, post=first, comment="two")
+        Like.objects.create(user=self.other, post=second)
+        call_command("reconcile_counters", stdout=StringIO())
+
+        response = self.client.get(reverse("postget", args=[first.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count_comments"], 2)
+        self.assertEqual(response.data["count_likes"], 0)
+        self.assertEqual(len(response.data["comments"]), 2)
+        self.assertEqual(response.data["likes"], [])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user("author@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(7):
+            Post.objects.create(user=self.user, title=f"post {i}",
+                                content="content")
+
+    def test_walks_every_post_once_in_both_directions(self):
+        url = reverse("postlist") + "?limit=3"
+        seen = []
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            pages.append(response.data)
+            seen.extend(post["uuid"] for post in response.data["results"])
+            url = response.data["next"]
+
+        expected = Post.objects.order_by("-created_at", "-uuid")
+        self.assertEqual(seen, [str(post.pk) for post in expected])
+        self.assertEqual([len(page["results"]) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[0]["previous"])
+
+        response = self.client.get(pages[2]["previous"])
+        self.assertEqual(response.data["results"], pages[1]["results"])
+
+    def test_page_size_is_capped_and_bad_cursor_rejected(self):
+        response = self.client.get(reverse("postlist"), {"limit": 10 ** 6})
+        self.assertEqual(len(response.data["results"]), 7)
+        response = self.client.get(reverse("postlist"), {"cursor": "junk"})
+        self.assertEqual(response.status_code, 404)
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.user = make_user("author@example.com")
+        self.other = make_user("reader@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+        self.post = Post.objects.create(user=self.user, title="a",
+                                        content="a")
+
+    def test_writes_maintain_counters(self):
+        self.client.post(reverse("likecreate"), {"post": self.post.pk},
+                         format="json")
+        self.client.post(reverse("commentcreate"),
+                         {"post": self.post.pk, "comment": "hi"},
+                         format="json")
+        self.client.post(reverse("followercreate", args=[self.user.pk]))
+
+        self.post.refresh_from_db()
+        self.user.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.user.followers_count, 1)
+        self.assertEqual(self.other.following_count, 1)
+
+        comment = Comment.objects.get()
+        self.client.delete(reverse("commentdelete", args=[comment.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        Like.objects.create(user=self.other, post=self.post)
+        Follow.objects.create(user=self.other, user_following=self.user)
+        Post.objects.update(comments_count=7)
+
+        call_command("reconcile_counters", "--chunk-size", "1",
+                     stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.user.followers_count, 1)
+        self.assertEqual(self.user.posts_count, 1)
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.author = make_user("author@example.com")
+        self.reader = make_user("reader@example.com")
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.client.post(reverse("followercreate", args=[self.author.pk]))
+
+    def publish(self, title):
+        self.author_client.post(reverse("postcreate"),
+                                {"title": title, "content": "x"},
+                                format="json")
+        return Post.objects.get(title=title)
+
+    def feed_titles(self):
+        response = self.client.get(reverse("feed"))
+        self.assertEqual(response.status_code, 200)
+        return [post["title"] for post in response.data["results"]]
+
+    def test_posts_fan_out_and_are_pruned(self):
+        first = self.publish("first")
+        self.publish("second")
+        self.assertEqual(TimelineEntry.objects.filter(
+            owner=self.reader).count(), 2)
+        self.assertEqual(self.feed_titles(), ["second", "first"])
+
+        self.author_client.delete(reverse("postdelete", args=[first.pk]))
+        self.assertEqual(self.feed_titles(), ["second"])
+
+        self.client.delete(reverse("followerdelete", args=[self.author.pk]))
+        self.assertEqual(self.feed_titles(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_popular_authors_are_pulled_on_read(self):
+        with mock.patch("core.feed.FANOUT_MAX_FOLLOWERS", 0):
+            self.publish("popular")
+            self.assertFalse(TimelineEntry.objects.exists())
+            self.assertEqual(self.feed_titles(), ["popular"])
+
+    def test_fan_out_follows_the_bumped_followers_count(self):
+        other = make_user("other@example.com")
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        self.publish("old")
+        with mock.patch("core.feed.FANOUT_MAX_FOLLOWERS", 1):
+            # The second follower makes the author popular: no backfill.
+            other_client.post(reverse("followercreate",
+                                      args=[self.author.pk]))
+            self.assertFalse(TimelineEntry.objects.filter(
+                owner=other).exists())
+            self.publish("popular")
+            self.assertEqual(self.feed_titles(), ["popular", "old"])
+
+            # Back under the threshold, posts made while popular are
+            # fanned out to the remaining followers.
+            other_client.delete(reverse("followerdelete",
+                                        args=[self.author.pk]))
+            self.assertEqual(TimelineEntry.objects.filter(
+                owner=self.reader).count(), 2)
+            self.assertEqual(self.feed_titles(), ["popular", "old"])
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        self.users = [make_user(f"user{i}@example.com") for i in range(4)]
+        a, b, c, d = self.users
+        for user, following in ((a, b), (b, a), (c, a), (a, d), (d, a)):
+            Follow.objects.create(user=user, user_following=following)
+        self.graph = FollowGraph()
+        self.graph.load()
+
+    def test_queries(self):
+        a, b, c, d = (user.pk for user in self.users)
+        self.assertEqual(list(self.graph.followers_of(a)), sorted([b, c, d]))
+        self.assertTrue(self.graph.follows(c, a))
+        self.assertFalse(self.graph.follows(a, c))
+        self.assertEqual(list(self.graph.mutual(a)), sorted([b, d]))
+
+    def test_incremental_updates(self):
+        a, b, c, d = (user.pk for user in self.users)
+        self.graph.add(a, c)
+        self.graph.remove(a, b)
+        self.assertEqual(list(self.graph.mutual(a)), sorted([c, d]))
+        self.assertEqual(len(self.graph.following_of(a)), 2)
+
+    def test_writes_during_a_rebuild_are_kept(self):
+        a, b, c, d = (user.pk for user in self.users)
+        snapshot = list(Follow.objects.values_list("user", "user_following"))
+
+        def edges(*args, **kwargs):
+            yield from snapshot
+            # Committed after the rebuild read the table.
+            self.graph.add(c, b)
+            self.graph.remove(a, b)
+
+        with mock.patch.object(Follow.objects, "order_by") as order_by:
+            order_by.return_value.values_list.return_value.iterator = edges
+            self.graph.load()
+        self.assertTrue(self.graph.follows(c, b))
+        self.assertFalse(self.graph.follows(a, b))
+        self.assertIsNone(self.graph.pending)
+
+    def test_start_rebuilds_in_the_background(self):
+        graph = FollowGraph()
+        with mock.patch.object(FollowGraph, "refresh") as refresh:
+            graph.start()
+            graph.start()
+            graph.refresher.join()
+        refresh.assert_called_once_with()
+        with mock.patch("core.graph.REBUILD_AFTER", None):
+            graph = FollowGraph()
+            graph.start()
+        self.assertIsNone(graph.refresher)
+        self.assertEqual(len(graph.followers_of(self.users[0].pk)), 3)
+
+    def test_counts_come_from_the_user_counters(self):
+        a = self.users[0]
+        # A write the graph never saw, e.g. from another process.
+        User.objects.filter(pk=a.pk).update(followers_count=7)
+        client = APIClient()
+        client.force_authenticate(a)
+        response = client.get(reverse("followcounts", args=[a.pk]))
+        self.assertEqual(response.data, {"followers": 7, "following": 0})
+        response = client.get(reverse("followcounts", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PostCacheTests(TestCase):
+    def setUp(self):
+        caches["posts"].clear()
+        self.user = make_user("author@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(user=self.user, title="a",
+                                        content="a")
+        self.url = reverse("postget", args=[self.post.pk])
+
+    def test_hit_skips_database_and_writes_invalidate(self):
+        self.client.get(self.url)
+        hits = stats["posts.hits"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(stats["posts.hits"], hits + 1)
+        self.assertEqual(response.data["count_likes"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("likecreate"), {"post": self.post.pk},
+                             format="json")
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["count_likes"], 1)
+
+    @override_settings(POST_CACHE_ENABLED=False)
+    def test_can_be_disabled(self):
+        self.client.get(self.url)
+        self.assertIsNone(caches["posts"].get(f"post:{self.post.pk}"))
+
+
+class BulkCreateTests(TestCase):
+    def setUp(self):
+        self.user = make_user("author@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(user=self.user, title="a",
+                                        content="a")
+
+    def test_comments_report_per_item_errors(self):
+        items = [{"post": str(self.post.pk), "comment": f"c{i}"}
+                 for i in range(50)]
+        items.insert(1, {"post": "not-a-post", "comment": "bad"})
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse("commentbulkcreate"), items,
+                                        format="json")
+
+        self.assertEqual(response.status_code, 207)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results[:3]],
+                         ["created", "error", "created"])
+        self.assertIn("post", results[1]["errors"])
+        self.post.refresh_from_db()
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertEqual(self.post.comments_count, 50)
+
+    def test_likes_skip_existing(self):
+        stored = Like.objects.create(user=self.user, post=self.post)
+        other = Post.objects.create(user=self.user, title="b", content="b")
+        items = [{"post": str(self.post.pk)}, {"post": str(other.pk)},
+                 {"post": str(other.pk)}]
+        response = self.client.post(reverse("likebulkcreate"), items,
+                                    format="json")
+
+        self.assertEqual(response.status_code, 201)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results],
+                         ["exists", "created", "exists"])
+        # "exists" items carry the uuid of the stored like.
+        self.assertEqual(results[0]["uuid"], stored.pk)
+        self.assertEqual(results[2]["uuid"], results[1]["uuid"])
+        self.assertTrue(Like.objects.filter(pk=results[1]["uuid"]).exists())
+        other.refresh_from_db()
+        self.assertEqual(other.likes_count, 1)
+        self.assertEqual(Like.objects.count(), 2)
+
+    def test_likes_stored_concurrently_are_not_counted(self):
+        # The like is stored after the view looked for existing ones.
+        stored_likes = LikeBulkCreateAPIView.stored_likes
+        reads = []
+
+        def racing(view, items):
+            if not reads:
+                reads.append(Like.objects.create(user=self.user,
+                                                 post=self.post))
+                return {}
+            return stored_likes(view, items)
+
+        with mock.patch.object(LikeBulkCreateAPIView, "stored_likes",
+                               racing):
+            response = self.client.post(reverse("likebulkcreate"),
+                                        [{"post": str(self.post.pk)}],
+                                        format="json")
+        result = response.data["results"][0]
+        self.assertEqual(result["status"], "exists")
+        self.assertEqual(result["uuid"], reads[0].pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+
+class LikeToggleTests(TestCase):
+    def setUp(self):
+        self.user = make_user("author@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(user=self.user, title="a",
+                                        content="a")
+        self.url = reverse("liketoggle", args=[self.post.pk])
+
+    def test_like_and_unlike_are_idempotent(self):
+        for _ in range(2):
+            response = self.client.post(self.url)
+            self.assertEqual(response.data, {"liked": True, "count": 1})
+        self.assertEqual(Like.objects.count(), 1)
+
+        for _ in range(2):
+            response = self.client.delete(self.url)
+            self.assertEqual(response.data, {"liked": False, "count": 0})
+        self.assertFalse(Like.objects.exists())
+
+    def test_update_then_select_without_returning(self):
+        with mock.patch("core.likes._update_returning", return_value=False):
+            response = self.client.post(self.url)
+            self.assertEqual(response.data, {"liked": True, "count": 1})
+            url = reverse("liketoggle",
+                          args=["00000000-0000-0000-0000-000000000000"])
+            self.assertEqual(self.client.post(url).status_code, 404)
+
+    def test_unknown_post(self):
+        url = reverse("liketoggle", args=["00000000-0000-0000-0000-000000000000"])
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.assertFalse(Like.objects.exists())
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        caches["posts"].clear()
+        self.user = make_user("author@example.com")
+        self.other = make_user("reader@example.com")
+        Follow.objects.create(user=self.other, user_following=self.user)
+        self.post = Post.objects.create(user=self.user, title="a",
+                                        content="a", comments_count=1)
+        Comment.objects.create(user=self.other, post=self.post, comment="hi")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.client.defaults["HTTP_AUTHORIZATION"] = (
+            f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def test_payloads_match_sync_views(self):
+        for name, args in [
+            ("postget", [self.post.pk]),
+            ("postlist", []),
+            ("postdata", [self.post.pk]),
+            ("commentuser", [self.other.pk]),
+            ("followers_of_user", [self.user.pk]),
+            ("following_of_user", [self.other.pk]),
+        ]:
+            expected = self.api.get(reverse(name, args=args))
+            response = self.client.get(reverse(f"{name}_async", args=args))
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.json(), expected.json(), name)
+
+    def test_requires_authentication(self):
+        del self.client.defaults["HTTP_AUTHORIZATION"]
+        response = self.client.get(reverse("postlist_async"))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+
+
+class SQLiteProfileTests(TestCase):
+    def test_pragmas_and_immediate_transactions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wrapper = DatabaseWrapper({
+                **connection.settings_dict,
+                "ENGINE": "SocialApp.sqlite",
+                "NAME": os.path.join(tmp, "db.sqlite3"),
+                "OPTIONS": {"pragmas": {"busy_timeout": 1234}},
+            })
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], 1234)
+                    cursor.execute("CREATE TABLE t (x integer)")
+
+                connections["profiled"] = wrapper
+                self.addCleanup(connections.__delitem__, "profiled")
+                other = sqlite3.connect(os.path.join(tmp, "db.sqlite3"),
+                                        timeout=0)
+                self.addCleanup(other.close)
+                with CaptureQueriesContext(wrapper) as queries, \
+                        transaction.atomic(using="profiled"):
+                    wrapper.cursor().execute("SELECT COUNT(*) FROM t")
+                    # Held from BEGIN on, before this transaction writes.
+                    with self.assertRaisesMessage(sqlite3.OperationalError,
+                                                  "database is locked"):
+                        other.execute("BEGIN IMMEDIATE")
+                self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+                other.execute("BEGIN IMMEDIATE")
+                other.rollback()
+            finally:
+                wrapper.close()
+
+
+class IndexUsageTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command("explain_hot_queries", stdout=out)
+        plans = out.getvalue()
+        # A virtual table scan is an FTS5 index lookup.
+        self.assertNotRegex(plans, r"SCAN core_\w+\b(?! VIRTUAL TABLE)")
+        self.assertIn("core_student_search VIRTUAL TABLE", plans)
+        self.assertNotIn("TEMP B-TREE", plans.split("feed: pulled")[0])
+        for index in ("core_comment_post_created_idx",
+                      "core_follow_followers_page_idx",
+                      "core_student_name_idx"):
+            self.assertIn(index, plans)
+
+
+class LoadTestHarnessTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        missing = [mount + route for mount, route in loadtest.routes()
+                   if loadtest.scenario_for(route) is None]
+        self.assertEqual(missing, [])
+        self.assertEqual(
+            loadtest.build_path("/api/", "follows/<int:pk>/<int:other>/",
+                                {"pk": 1, "other": 2}),
+            "/api/follows/1/2/",
+        )
+
+    def test_compare_flags_regressions(self):
+        def document(p95, queries):
+            return {"endpoints": {"/api/post/list/": {
+                "latency_ms": {"p95": p95}, "throughput_rps": 100.0,
+                "queries_per_request": queries,
+            }}}
+
+        [row] = loadtest.compare(document(10.0, 3), document(10.5, 3), 0.1)
+        self.assertFalse(row[-1])
+        [row] = loadtest.compare(document(10.0, 3), document(12.0, 3), 0.1)
+        self.assertTrue(row[-1])
+        [row] = loadtest.compare(document(10.0, 3), document(9.0, 4), 0.1)
+        self.assertTrue(row[-1])
+
+    def test_seeds_without_known_credentials(self):
+        self.assertTrue(loadtest.is_test_database())
+        data = loadtest.Dataset(loadtest.SIZES["small"])
+        data.seed()
+        self.assertFalse(User.objects.filter(is_admin=True).exists())
+        self.assertFalse(data.actor.check_password("loadtest-password"))
+        self.assertTrue(data.actor.check_password(data.plain_password))
+
+        data.cleanup()
+        data.seed(admin=True)
+        self.assertTrue(data.admin.is_admin)
+        self.assertFalse(data.admin.has_usable_password())
+        data.cleanup()
+        self.assertFalse(User.objects.exists())
+
+    def test_refuses_a_non_test_database(self):
+        with mock.patch("core.loadtest.is_test_database",
+                        return_value=False):
+            with self.assertRaises(CommandError):
+                call_command("loadtest", stdout=StringIO())
+
+
+class QueryInstrumentationTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(name="Neha")
+        course = Course.objects.create(name="Python", teacher=teacher)
+        for i in range(4):
+            Student.objects.create(name=f"S{i}", roll=str(i), address="-",
+                                   email=f"s{i}@example.com").courses.add(
+                course)
+
+    @mock.patch("core.middleware.SAMPLE_RATE", 1.0)
+    @mock.patch("core.middleware.REPEAT_THRESHOLD", 3)
+    # Without the prefetch each student loads its own courses.
+    @mock.patch.object(StudentQuerySet, "with_courses", lambda self: self)
+    def test_server_timing_and_repeated_queries(self):
+        with self.assertLogs("core.sql", "WARNING") as logs:
+            response = self.client.post(
+                reverse("student-by-teacher"), {"teacher_name": "Neha"},
+                content_type="application/json",
+            )
+        self.assertRegex(response["Server-Timing"],
+                         r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=')
+        self.assertIn("ran 4 times", logs.output[0])
+
+    @mock.patch("core.middleware.SAMPLE_RATE", 1.0)
+    async def test_async_views_are_counted(self):
+        user = await User.objects.acreate(email="a@example.com",
+                                          first_name="A", last_name="B",
+                                          gender="M")
+        response = await self.async_client.get(
+            reverse("likelist_async"),
+            headers={"Authorization": f"Bearer {AccessToken.for_user(user)}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+    @mock.patch("core.middleware.SAMPLE_RATE", 0.0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get(reverse("student-total"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_normalize(self):
+        self.assertEqual(
+            normalize("SELECT 1 FROM t WHERE a IN (%s, %s) AND b = 'x'"),
+            "SELECT ? FROM t WHERE a IN (...) AND b = ?",
+        )
+
+
+class ProfilingTests(TestCase):
+    def test_sampled_requests_are_profiled(self):
+        Student.objects.create(name="S", roll="1", address="-",
+                               email="s@example.com")
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("core.profiling.PROFILE_DIR", Path(tmp)), \
+                mock.patch("core.profiling.SAMPLE_RATES",
+                           {"student-total": 1.0, "student-by-name": 1.0}), \
+                mock.patch("core.profiling.store",
+                           profiling.ProfileStore()):
+            for _ in range(2):
+                self.assertEqual(
+                    self.client.get(reverse("student-total")).status_code,
+                    200,
+                )
+            # Two views sharing the URL name student-by-name.
+            self.client.get("/api/students/email/")
+            self.client.post("/api/students/name/", {"name_start": "S"})
+            self.client.get(reverse("student-by-teacher"))
+            # Written on the flush interval, not per request.
+            self.assertEqual(profiling.load(tmp), {})
+
+            out = StringIO()
+            call_command("profile_report", "--dir", tmp, stdout=out)
+            self.assertEqual(sorted(profiling.load(tmp)), [
+                "student-by-name api/students/email/",
+                "student-by-name api/students/name/",
+                "student-total api/students/total/",
+            ])
+        report = out.getvalue()
+        self.assertIn("student-total api/students/total/: 2 requests",
+                      report)
+        self.assertIn("render", report)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("core.metrics.registry", metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_latency_and_queries_by_route(self):
+        for _ in range(2):
+            self.client.get(reverse("student-total"))
+        body = self.client.get(reverse("metrics")).content.decode()
+        labels = 'method="GET",route="api/students/total/",status="200"'
+        self.assertIn(f"http_requests_total{{{labels}}} 2", body)
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2',
+            body,
+        )
+        self.assertIn('db_queries_total{route="api/students/total/"} 2',
+                      body)
+
+    async def test_async_views_are_counted(self):
+        user = await User.objects.acreate(email="a@example.com",
+                                          first_name="A", last_name="B",
+                                          gender="M")
+        await self.async_client.get(
+            reverse("likelist_async"),
+            headers={"Authorization": f"Bearer {AccessToken.for_user(user)}"},
+        )
+        body = metrics.render(metrics.registry.collect())
+        self.assertIn('db_queries_total{route="api/async/like/list/"} 2',
+                      body)
+
+    @mock.patch.dict(stats, {"posts.hits": 3, "posts.misses": 1},
+                     clear=True)
+    def test_file_mode_sums_every_process(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("core.metrics.MODE", "file"), \
+                mock.patch("core.metrics.METRICS_DIR", Path(tmp)):
+            Path(tmp, "1.json").write_text(json.dumps(
+                metrics.Registry().snapshot()
+            ))
+            body = self.client.get(reverse("metrics")).content.decode()
+            self.assertEqual(len(list(Path(tmp).glob("*.json"))), 2)
+        self.assertIn('cache_hits_total{cache="posts"} 6', body)
+        self.assertIn('cache_hit_ratio{cache="posts"} 0.75', body)
+
+    @mock.patch("core.metrics.TOKEN", "s3cret")
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"),
+                                   HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+
+class StudentSearchTests(TestCase):
+    def setUp(self):
+        teacher = Teacher.objects.create(name="Neha")
+        self.course = Course.objects.create(name="Python", teacher=teacher)
+        self.students = {}
+        for roll, name in enumerate(["Sonam Rai", "Sobha", "Asok So",
+                                     "Ravi"]):
+            self.students[name] = Student.objects.create(
+                name=name, roll=str(roll), address="-",
+                email=f"{name.split()[0].lower()}@example.com",
+            )
+        self.students["Sobha"].courses.add(self.course)
+        self.course.students.add(self.students["Ravi"])
+
+    def found(self, text):
+        return {pk for _, pk in search.ranked(search.prefix_query(text))}
+
+    def test_signals_keep_the_index_in_sync(self):
+        sobha, ravi = self.students["Sobha"], self.students["Ravi"]
+        self.assertEqual(self.found("pyth"), {sobha.pk, ravi.pk})
+        self.course.name = "Django"
+        self.course.save()
+        self.assertEqual(self.found("pyth"), set())
+        self.assertEqual(self.found("djan"), {sobha.pk, ravi.pk})
+        sobha.courses.clear()
+        self.course.students.clear()
+        self.assertEqual(self.found("djan"), set())
+        ravi.delete()
+        self.assertEqual(self.found("ravi"), set())
+
+    def test_search_pages_through_ranked_results(self):
+        seen = []
+        url = reverse("student-search") + "?q=so&limit=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["name"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertCountEqual(seen, ["Sonam Rai", "Sobha", "Asok So"])
+        self.assertEqual(
+            self.client.get(reverse("student-search")).status_code, 400
+        )
+
+    def test_name_endpoints_use_the_index(self):
+        # The name and exclude routes share a URL name, so use the paths.
+        response = self.client.post("/api/students/name/",
+                                    {"name_start": "So"},
+                                    content_type="application/json")
+        self.assertCountEqual([row["name"] for row in response.data],
+                              ["Sonam Rai", "Sobha"])
+        response = self.client.post("/api/students/exclude/",
+                                    {"input_name": "So"},
+                                    content_type="application/json")
+        self.assertCountEqual([row["name"] for row in response.data],
+                              ["Asok So", "Ravi"])
+
+
+class StudentReadPathTests(TestCase):
+    def setUp(self):
+        self.python = Course.objects.create(
+            name="Python", teacher=Teacher.objects.create(name="Neha"),
+        )
+        self.java = Course.objects.create(
+            name="Java", teacher=Teacher.objects.create(name="Poja"),
+        )
+        self.rolls = 0
+
+    def add(self, name, *courses, email=None):
+        self.rolls += 1
+        student = Student.objects.create(
+            name=name, roll=str(self.rolls), address="-",
+            email=email or f"{self.rolls}@example.com",
+        )
+        student.courses.add(*courses)
+        return student
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["name"] for row in response.data)
+
+    def test_query_count_is_flat_in_table_size(self):
+        requests = [
+            ("post", "/api/students/name/", {"name_start": "S"}),
+            ("post", "/api/students/exclude/", {"input_name": "X"}),
+            ("get", "/api/students/email/", {"email_is": "1@example.com"}),
+            ("post", "/api/students/teacher/", {"teacher_name": "Neha"}),
+            ("post", "/api/students/subject/", {"enrolled_sub": "Python"}),
+            ("get", "/api/students/all/", {}),
+            ("get", "/api/students/search/", {"q": "s"}),
+        ]
+
+        def counts():
+            result = []
+            for method, path, data in requests:
+                kwargs = ({"content_type": "application/json"}
+                          if method == "post" else {})
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.client, method)(path, data,
+                                                            **kwargs)
+                self.assertEqual(response.status_code, 200, path)
+                result.append(len(queries))
+            return result
+
+        for i in range(2):
+            self.add(f"S{i}", self.python, self.java)
+        counts()
+        small = counts()
+        for i in range(2, 30):
+            self.add(f"S{i}", self.python, self.java)
+        self.assertEqual(counts(), small)
+
+    def test_filter_matches_any_condition(self):
+        self.add("Sonam")
+        self.add("Amit")
+        self.add("Sita")
+        self.add("Suresh", self.python)
+        self.add("Sunil", self.java)
+        self.add("Sam", email="so@gmail.com")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("student-sub"))
+        self.assertEqual(self.names(response),
+                         ["Amit", "Sam", "Sonam", "Sunil", "Suresh"])
+        self.assertNotIn("DISTINCT", queries[0]["sql"])
+
+        response = self.client.get(reverse("student-sub"), {
+            "name_start": "Si", "exclude_start": "",
+            "course": "Java", "teacher": "Nobody", "email": "-",
+        })
+        self.assertEqual(self.names(response), ["Sita", "Sunil"])
+
+    def test_teacher_and_subject_list_each_student_once(self):
+        kotlin = Course.objects.create(name="Kotlin",
+                                       teacher=self.java.teacher)
+        self.add("Sonam", self.python, self.java, kotlin)
+        self.add("Amit", self.java)
+        response = self.client.post("/api/students/teacher/",
+                                    {"teacher_name": "Poja"},
+                                    content_type="application/json")
+        self.assertEqual(self.names(response), ["Amit", "Sonam"])
+        response = self.client.post("/api/students/subject/",
+                                    {"enrolled_sub": "Python"},
+                                    content_type="application/json")
+        self.assertEqual(self.names(response), ["Sonam"])
+
+
+@mock.patch("core.streaming.CHUNK_SIZE", 2)
+class StreamingTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(
+            name="Python", teacher=Teacher.objects.create(name="Neha"),
+        )
+        for i in range(5):
+            Student.objects.create(name=f"A{i}", roll=str(i), address="-",
+                                   email=f"{i}@example.com").courses.add(
+                course)
+        self.expected = self.client.get(reverse("student-sub")).json()
+
+    def test_json_array_matches_the_plain_response(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("student-sub"),
+                                       {"stream": "json"})
+            pieces = list(response.streaming_content)
+        # "[", three chunks of rows, "]"; one read of the rows and one
+        # prefetch per chunk.
+        self.assertEqual(len(pieces), 5)
+        self.assertEqual(len(queries), 4)
+        self.assertEqual(json.loads(b"".join(pieces)), self.expected)
+
+    def test_ndjson(self):
+        response = self.client.get(reverse("student-sub"),
+                                   {"stream": "ndjson"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected)
+        self.assertEqual(self.client.get(reverse("student-sub"),
+                                         {"stream": "xml"}).status_code, 400)
+
+    async def test_asgi_streams_without_buffering(self):
+        response = await self.async_client.get(reverse("student-sub"),
+                                               {"stream": "json"})
+        self.assertTrue(response.is_async)
+        body = b"".join([piece async for piece in response.streaming_content])
+        self.assertEqual(json.loads(body), self.expected)
+
+
+class CountTests(TestCase):
+    def setUp(self):
+        caches[counts.CACHE_ALIAS].clear()
+        Student.objects.bulk_create(
+            Student(name=f"S{i}", roll=str(i), address="-",
+                    email=f"{i}@example.com")
+            for i in range(3)
+        )
+
+    def test_exact_counts_follow_bulk_writes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(counts.exact(Student.objects.all()), 3)
+        Student.objects.filter(roll="0").delete()
+        self.assertEqual(counts.exact(Student.objects.all()), 2)
+        # Filtered querysets are counted.
+        self.assertEqual(counts.exact(Student.objects.filter(roll="1")), 1)
+
+    def test_migrations_keep_the_count_triggers(self):
+        # A migration that rebuilds a counted table drops its triggers.
+        self.assertEqual(counts.missing_triggers(), [])
+
+    def test_reconcile_reinstalls_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER core_student_count_insert")
+        Student.objects.create(name="S3", roll="3", address="-",
+                               email="3@example.com")
+        self.assertEqual(counts.exact(Student.objects.all()), 3)
+        self.assertEqual(
+            [error.id for error in checks.run_checks(databases=["default"])
+             if error.id.startswith("core.")],
+            ["core.W001"],
+        )
+
+        call_command("reconcile_counters", "--only", "tables",
+                     stdout=StringIO())
+        self.assertEqual(counts.missing_triggers(), [])
+        self.assertEqual(counts.exact(Student.objects.all()), 4)
+        Student.objects.create(name="S4", roll="4", address="-",
+                               email="4@example.com")
+        self.assertEqual(counts.exact(Student.objects.all()), 5)
+
+    def test_cached_and_estimated_counts(self):
+        queryset = Student.objects.filter(name__startswith="S")
+        self.assertEqual(counts.cached(queryset), 3)
+        Student.objects.create(name="S3", roll="3", address="-",
+                               email="3@example.com")
+        with self.assertNumQueries(0):
+            self.assertEqual(counts.cached(queryset), 3)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE core_student")
+        Student.objects.create(name="S4", roll="4", address="-",
+                               email="4@example.com")
+        self.assertEqual(counts.estimated(Student.objects.all()), 4)
+        self.assertEqual(counts.exact(Student.objects.all()), 5)
+
+        response = self.client.get(reverse("student-total"),
+                                   {"mode": "cached"})
+        self.assertEqual(response.data, {"total_students": 5})
+        response = self.client.get(reverse("student-total"),
+                                   {"mode": "approximate"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_totals_on_request(self):
+        user, other = make_user("a@example.com"), make_user("b@example.com")
+        Follow.objects.create(user=other, user_following=user)
+        User.objects.filter(pk=user.pk).update(followers_count=1)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse("followers_of_user", args=[user.pk])
+        self.assertNotIn("count", client.get(url).data)
+        with self.assertNumQueries(2):
+            response = client.get(url, {"count": "true"})
+        self.assertEqual(response.data["count"], 1)
+        response = client.get(reverse("likelist"), {"count": "true"})
+        self.assertEqual(response.data["count"], 0)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = make_user("a@example.com")
+        other = make_user("b@example.com")
+        posts = [Post.objects.create(user=self.user, title=f"T{i}",
+                                     content='"quoted"\n') for i in range(3)]
+        Comment.objects.create(user=self.user, post=posts[0], comment="hi")
+        Like.objects.create(user=self.user, post=posts[1])
+        Follow.objects.create(user=self.user, user_following=other)
+        Follow.objects.create(user=other, user_following=self.user)
+        # Someone else's rows are left out.
+        Post.objects.create(user=other, title="X", content="-")
+
+    def read(self, body):
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_lines(self):
+        rows = self.read(b"".join(export.lines(self.user.pk, chunk_size=2)))
+        self.assertEqual([row["type"] for row in rows],
+                         ["user"] + ["post"] * 3 + ["comment", "like"]
+                         + ["follow"] * 2)
+        self.assertEqual(rows[0]["email"], "a@example.com")
+        post = Post.objects.get(title="T0")
+        self.assertEqual(rows[1]["uuid"], str(post.uuid))
+        self.assertEqual(rows[1]["content"], '"quoted"\n')
+        self.assertEqual(rows[1]["created_at"], post.created_at.isoformat())
+        self.assertEqual(rows[4]["post"], str(post.uuid))
+
+    def test_other_databases_get_the_same_lines(self):
+        Comment.objects.create(user=self.user, post=Post.objects.first(),
+                               comment="caf\u00e9 \\ \u2603")
+        # Whole seconds have no fraction in either encoding.
+        Post.objects.filter(title="T2").update(
+            created_at=datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+        built = b"".join(export.lines(self.user.pk))
+        with mock.patch("core.export.built_by_database",
+                        return_value=False):
+            encoded = b"".join(export.lines(self.user.pk))
+        self.assertEqual(encoded, built)
+
+    def test_command(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "export.ndjson.gz"
+            call_command("export_user_data", "a@example.com",
+                         output=str(path), stdout=out)
+            rows = self.read(gzip.decompress(path.read_bytes()))
+        self.assertEqual(len(rows), 8)
+        self.assertIn("Wrote", out.getvalue())
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse("user-export"), {"gzip": "true"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn(".ndjson.gz", response["Content-Disposition"])
+        rows = self.read(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual(rows[0]["id"], self.user.pk)
+
+        # ?user= is ignored for everyone but admins.
+        other = User.objects.get(email="b@example.com")
+        response = client.get(reverse("user-export"), {"user": other.pk})
+        rows = self.read(b"".join(response.streaming_content))
+        self.assertEqual(rows[0]["id"], self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_admin=True)
+        self.user.refresh_from_db()
+        client.force_authenticate(self.user)
+        response = client.get(reverse("user-export"), {"user": other.pk})
+        rows = self.read(b"".join(response.streaming_content))
+        self.assertEqual([row["type"] for row in rows],
+                         ["user", "post", "follow", "follow"])
+        response = client.get(reverse("user-export"), {"user": "nobody"})
+        self.assertEqual(response.status_code, 404)
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.write("teachers.csv", "name\nNeha\n")
+        self.write("courses.ndjson",
+                   '{"name": "Python", "teacher": "Neha"}\n'
+                   '{"name": "Django", "teacher": "Ravi"}\n')
+        self.write("students.csv",
+                   "roll,email,name,address\n"
+                   + "".join(f"{i},{i}@example.com,Student {i},-\n"
+                             for i in range(5)))
+        self.write("enrollments.csv",
+                   "roll,course\n0,Python\n1,Django\n1,Django\n9,Python\n")
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content)
+        return str(path)
+
+    def path(self, name):
+        return str(Path(self.directory.name) / name)
+
+    def run_import(self, **files):
+        out = StringIO()
+        call_command("import_roster", stdout=out, batch_size=2,
+                     **{kind: self.path(name) for kind, name in files.items()})
+        return out.getvalue()
+
+    def test_import(self):
+        out = self.run_import(
+            teachers="teachers.csv", courses="courses.ndjson",
+            students="students.csv", enrollments="enrollments.csv",
+        )
+        self.assertIn("students: 5 created, 0 updated, 0 skipped", out)
+        self.assertIn("enrollments: 2 created, 0 updated, 2 skipped", out)
+        self.assertEqual(Teacher.objects.count(), 2)
+        self.assertEqual(
+            Course.objects.get(name="Django").teacher.name, "Ravi"
+        )
+        student = Student.objects.get(roll="1")
+        self.assertEqual(list(student.courses.values_list("name", flat=True)),
+                         ["Django"])
+        self.assertEqual(counts.exact(Student.objects.all()), 5)
+        if search.available():
+            self.assertEqual(
+                [pk for _, pk in search.ranked(search.prefix_query("django"))],
+                [student.pk],
+            )
+
+    def test_upsert_on_roll_or_email(self):
+        self.run_import(students="students.csv")
+        self.write("students.csv",
+                   "roll,email,name,address\n"
+                   "0,new@example.com,Renamed,-\n"   # by roll
+                   "10,1@example.com,Moved,-\n"      # by email
+                   "2,3@example.com,Clash,-\n")      # two students
+        out = self.run_import(students="students.csv")
+        self.assertIn("0 created, 2 updated, 1 skipped", out)
+        self.assertEqual(Student.objects.get(roll="0").email,
+                         "new@example.com")
+        self.assertEqual(Student.objects.get(email="1@example.com").roll, "10")
+        self.assertEqual(Student.objects.get(roll="2").name, "Student 2")
+        self.assertEqual(Student.objects.count(), 5)
+
+    def test_resumes_from_checkpoint(self):
+        checkpoint = self.path("progress.json")
+        with open(checkpoint, "w") as file:
+            json.dump({"students": 4}, file)
+        out = StringIO()
+        call_command("import_roster", students=self.path("students.csv"),
+                     checkpoint=checkpoint, stdout=out)
+        self.assertIn("1 records", out.getvalue())
+        self.assertEqual(list(Student.objects.values_list("roll", flat=True)),
+                         ["4"])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_reads_batches_lazily(self):
+        rows = roster.batches(({"n": i} for i in range(5)), 2)
+        self.assertEqual([len(batch) for batch in rows], [2, 2, 1])
@@ -1,12 +1,27 @@
 from django.urls import path
 
+from core.async_views import (
+    AsyncCommentListView,
+    AsyncFollowersListView,
+    AsyncFollowingListView,
+    AsyncLikeListView,
+    AsyncLikeRetrieveView,
+    AsyncPostCommentsListView,
+    AsyncPostListView,
+    AsyncPostRetrieveView,
+)
 from core.views import (
+    CommentBulkCreateAPIView,
+    LikeBulkCreateAPIView,
+    PostBulkCreateAPIView,
+    CacheStatsAPIView,
     CommentListAPIView,
     FollowersListAPIView,
     FollowingListAPIView,
     LikeCreateAPIView,
     LikeListAPIView,
     LikeRetrieveAPIView,
+    LikeToggleAPIView,
     PostCommentsListAPIView,
     PostCreateAPIView,
     PostDeleteAPIView,
@@ -17,18 +32,28 @@ from core.views import (
     CommentDeleteAPIView,
     CommentUpdateAPIView,
     FollowersCreateAPIView,
+    FollowersDeleteAPIView,
+    FeedAPIView,
+    FollowCheckAPIView,
+    FollowCountsAPIView,
+    MutualFollowsAPIView,
     StudentByNameAPIView,
     StudentByEmailAPIView,
     StudentLearnByTeacherAPIView,
     StudentsExcludingSAPIView,
     TotalStudentsAPIView,
     StudentEnrolledSubjectAPIView,
-    StudentFilterAPIView
+    StudentFilterAPIView,
+    StudentSearchAPIView,
+    UserDataExportAPIView,
 )
 
 urlpatterns = [
     path("post/create/", PostCreateAPIView.as_view(), name="postcreate"),
+    path("post/bulk/create/", PostBulkCreateAPIView.as_view(), name="postbulkcreate"),
     path("post/get/<uuid:pk>/", PostRetrieveAPIView.as_view(), name="postget"),
+    path("post/cache/stats/", CacheStatsAPIView.as_view(), name="cachestats"),
+    path("export/", UserDataExportAPIView.as_view(), name="user-export"),
     path("post/list/", PostListAPIView.as_view(), name="postlist"),
     path("post/update/<uuid:pk>/", PostUpdateAPIView.as_view(), name="postupdate"),
     path("post/delete/<uuid:pk>/", PostDeleteAPIView.as_view(), name="postdelete"),
@@ -37,6 +62,7 @@ urlpatterns = [
     ),
     path("comments/user/<int:pk>/", CommentListAPIView.as_view(), name="commentuser"),
     path("comment/create/", CommentCreateAPIView.as_view(), name="commentcreate"),
+    path("comment/bulk/create/", CommentBulkCreateAPIView.as_view(), name="commentbulkcreate"),
     path("comment/delete/<uuid:pk>/", CommentDeleteAPIView.as_view(), name="commentdelete"),
     path("comment/update/<uuid:pk>/", CommentUpdateAPIView.as_view(), name="commentupdate"),
 
@@ -51,10 +77,40 @@ urlpatterns = [
         name="following_of_user",
     ),
     path("follower/create/<int:pk>/", FollowersCreateAPIView.as_view(), name="followercreate"),
+    path("follower/delete/<int:pk>/", FollowersDeleteAPIView.as_view(), name="followerdelete"),
+    path("followers/count/<int:pk>/", FollowCountsAPIView.as_view(), name="followcounts"),
+    path("followers/mutual/<int:pk>/", MutualFollowsAPIView.as_view(), name="mutualfollows"),
+    path("follows/<int:pk>/<int:other>/", FollowCheckAPIView.as_view(), name="followcheck"),
+    path("feed/", FeedAPIView.as_view(), name="feed"),
 
     path("like/create/", LikeCreateAPIView.as_view(), name="likecreate"),
+    path("like/bulk/create/", LikeBulkCreateAPIView.as_view(), name="likebulkcreate"),
+    path("like/toggle/<uuid:pk>/", LikeToggleAPIView.as_view(), name="liketoggle"),
     path("like/get/<uuid:pk>/", LikeRetrieveAPIView.as_view(), name="likeget"),
     path("like/list/", LikeListAPIView.as_view(), name="likelist"),
+
+    # ASGI-native versions of the read endpoints above.
+    path("async/post/get/<uuid:pk>/", AsyncPostRetrieveView.as_view(), name="postget_async"),
+    path("async/post/list/", AsyncPostListView.as_view(), name="postlist_async"),
+    path(
+        "async/comments/post/<uuid:pk>/",
+        AsyncPostCommentsListView.as_view(),
+        name="postdata_async",
+    ),
+    path("async/comments/user/<int:pk>/", AsyncCommentListView.as_view(), name="commentuser_async"),
+    path("async/like/get/<uuid:pk>/", AsyncLikeRetrieveView.as_view(), name="likeget_async"),
+    path("async/like/list/", AsyncLikeListView.as_view(), name="likelist_async"),
+    path(
+        "async/followers/user/<int:pk>/",
+        AsyncFollowersListView.as_view(),
+        name="followers_of_user_async",
+    ),
+    path(
+        "async/followings/user/<int:pk>/",
+        AsyncFollowingListView.as_view(),
+        name="following_of_user_async",
+    ),
+
     path('students/name/', StudentByNameAPIView.as_view(), name='student-by-name'),
     path('students/email/', StudentByEmailAPIView.as_view(), name='student-by-name'),
     path('students/teacher/', StudentLearnByTeacherAPIView.as_view(), name='student-by-teacher'),
@@ -62,6 +118,7 @@ urlpatterns = [
     path('students/total/', TotalStudentsAPIView.as_view(), name='student-total'),
     path('students/subject/', StudentEnrolledSubjectAPIView.as_view(), name='student-sub'),
     path('students/all/', StudentFilterAPIView.as_view(), name='student-sub'),
+    path('students/search/', StudentSearchAPIView.as_view(), name='student-search'),
 
 
 
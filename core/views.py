@@ -1,3 +1,11 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.http import HttpResponse, JsonResponse
+from django.views import View
 from rest_framework import status
 from rest_framework.generics import (
     CreateAPIView,
@@ -7,28 +15,40 @@ from rest_framework.generics import (
     UpdateAPIView,
 )
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from authentication.models import User
 
 # from core.CustomPagination import CustomPagination
 from core.serializers import (
+    CommentBulkSerializer,
     CommentSerializer,
     FollowersSerializer,
     FollowingsSerializer,
     FollowSerializer,
+    LikeBulkSerializer,
     LikeSerializer,
+    PostBulkSerializer,
     PostGetSerializer,
     PostSerializer,
     StudentSerializer
 )
 
+from . import counts, export, feed, metrics, search
+from .CustomPagination import FeedPagination, SearchPagination
+from .cache import post_cache, stats
+from .counters import bump
+from .graph import follow_graph
+from .likes import PostNotFound, set_like
 from .models import Comment, Follow, Like, Post, Student
 from .permissions import IsOwnerOrReadOnly
+from .streaming import StreamingListMixin, streaming_response
 
 # from django.shortcuts import get_object_or_404
 
+BULK_CREATE_MAX_ITEMS = getattr(settings, "BULK_CREATE_MAX_ITEMS", 10000)
+
 
 class PostCreateAPIView(CreateAPIView):
     """
@@ -44,7 +64,10 @@ class PostCreateAPIView(CreateAPIView):
 
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save()
+            with transaction.atomic():
+                post = serializer.save()
+                bump(User.objects.filter(pk=post.user_id), posts_count=1)
+                feed.fan_out(post)
             return Response(
                 {"msg": "Post Created Successfully!"},
                 status=status.HTTP_201_CREATED,
@@ -53,22 +76,106 @@ class PostCreateAPIView(CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkCreateAPIView(CreateAPIView):
+    """
+    Base view for the bulk create endpoints. It validates a list of
+    objects with a many=True serializer, writes the valid ones with
+    bulk_create in one transaction and reports every item by index.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            for item in request.data:
+                if isinstance(item, dict) and "user" not in item:
+                    item["user"] = request.user.id
+
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=BULK_CREATE_MAX_ITEMS
+        )
+        serializer.is_valid(raise_exception=True)
+
+        results = [
+            {"index": index, "status": "error", "errors": errors}
+            for index, errors in serializer.item_errors.items()
+        ]
+        if serializer.validated_data:
+            with transaction.atomic():
+                for index, obj, created in self.bulk_create(serializer):
+                    results.append({
+                        "index": index,
+                        "status": "created" if created else "exists",
+                        "uuid": obj.pk,
+                    })
+        results.sort(key=lambda result: result["index"])
+
+        if not serializer.item_errors:
+            response_status = status.HTTP_201_CREATED
+        elif serializer.validated_data:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({"results": results}, status=response_status)
+
+    def bulk_create(self, serializer):
+        """
+        Writes serializer.validated_data and returns (index, obj, created)
+        for every valid item.
+        """
+        objs = serializer.save()
+        self.after_bulk_create(objs)
+        return [
+            (index, obj, True)
+            for index, obj in zip(serializer.valid_indices, objs)
+        ]
+
+    def after_bulk_create(self, objs):
+        pass
+
+
+def count_by(objs, attname):
+    counts = {}
+    for obj in objs:
+        key = getattr(obj, attname)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+class PostBulkCreateAPIView(BulkCreateAPIView):
+    """
+    This view is used to create many posts in one request
+    """
+
+    serializer_class = PostBulkSerializer
+
+    def after_bulk_create(self, posts):
+        for user_id, total in count_by(posts, "user_id").items():
+            bump(User.objects.filter(pk=user_id), posts_count=total)
+        feed.fan_out_many(posts)
+
+
 class PostRetrieveAPIView(RetrieveAPIView):
     """
     This view is used to retrieve post on given id
     """
 
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_engagement()
     serializer_class = PostGetSerializer
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk, *args, **kwargs):
+        data = post_cache.get(pk)
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+
         # post = Post.objects.filter(pk=pk).first()
         post = self.get_object()
 
         if post:
             # serializer = PostGetSerializer(post)
             serializer = self.get_serializer(post)
+            post_cache.set(pk, serializer.data)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(
             {"errors": {"msg": "Invalid Post Id!"}},
@@ -76,14 +183,75 @@ class PostRetrieveAPIView(RetrieveAPIView):
         )
 
 
+class CacheStatsAPIView(APIView):
+    """
+    This view will show the hit/miss/eviction counters of the caches
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(dict(stats), status=status.HTTP_200_OK)
+
+
+class MetricsView(View):
+    """
+    This view will show the request, query and cache metrics in the
+    Prometheus text format
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not metrics.may_scrape(request):
+            return JsonResponse(
+                {"errors": {"msg": "Not allowed to read metrics!"}},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return HttpResponse(
+            metrics.render(metrics.registry.collect()),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+class UserDataExportAPIView(APIView):
+    """
+    This view will download the profile, posts, comments, likes and
+    follows of the login user as NDJSON, gzip compressed with ?gzip=true.
+    Admins can export another user with ?user=<id>
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user_id = request.user.id
+        if request.user.is_admin and "user" in request.query_params:
+            user_id = request.query_params["user"]
+            if not (user_id.isdigit()
+                    and User.objects.filter(pk=user_id).exists()):
+                return Response({"errors": {"msg": "User not found!"}},
+                                status=status.HTTP_404_NOT_FOUND)
+
+        pieces = export.lines(user_id)
+        filename = f"user-{user_id}.ndjson"
+        content_type = "application/x-ndjson"
+        if request.query_params.get("gzip") == "true":
+            pieces = export.gzipped(pieces)
+            filename += ".gz"
+            content_type = "application/gzip"
+        response = streaming_response(request, pieces,
+                                      content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
 class PostListAPIView(ListAPIView):
     """ "
     This view will show all the post
     """
 
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_engagement()
     serializer_class = PostGetSerializer
     permission_classes = [IsAuthenticated]
+    count_mode = counts.EXACT
 
 
 class PostUpdateAPIView(UpdateAPIView):
@@ -162,7 +330,9 @@ class PostDeleteAPIView(DestroyAPIView):
         post = self.get_object()
 
         if post:
-            post.delete()
+            with transaction.atomic():
+                post.delete()
+                bump(User.objects.filter(pk=post.user_id), posts_count=-1)
             return Response(
                 {"msg": "Post Deleted Successfully!"},
                 status=status.HTTP_200_OK,
@@ -183,28 +353,23 @@ class PostCommentsListAPIView(ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk, *args, **kwargs):
-        likes = comments = 0
-        post_data = {}
-
-        all_comments = Comment.objects.filter(post=pk)
-        if all_comments is not None:
-            comment_serializer = CommentSerializer(all_comments, many=True)
-            comments = all_comments.count()
-            post_data["Count Of Comments"] = all_comments.count()
-            post_data["Comments"] = comment_serializer.data
-
-        all_likes = Like.objects.filter(post=pk)
-        if all_likes is not None:
-            like_serializer = LikeSerializer(all_likes, many=True)
-            likes = len(like_serializer.data)
-            post_data["Count Of Likes"] = likes
-
-        if likes == 0 and comments == 0:
+        post = Post.objects.filter(pk=pk).first()
+        if post is None or (post.likes_count == 0
+                            and post.comments_count == 0):
             return Response(
                 {"msg": "No Likes and Comments on this Post!"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        comments = self.paginate_queryset(Comment.objects.filter(post=pk))
+        comment_serializer = CommentSerializer(comments, many=True)
+        post_data = {
+            "Count Of Comments": post.comments_count,
+            "Comments": comment_serializer.data,
+            "Count Of Likes": post.likes_count,
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
+        }
         return Response(post_data, status=status.HTTP_200_OK)
 
 
@@ -216,18 +381,14 @@ class CommentListAPIView(ListAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    # No per-user comment counter to read.
+    count_mode = counts.CACHED
 
     def get(self, request, pk, *args, **kwargs):
-        comments = Comment.objects.filter(user=pk)
-        if comments:
+        comments = self.paginate_queryset(Comment.objects.filter(user=pk))
+        if comments or "cursor" in request.query_params:
             serializer = self.get_serializer(comments, many=True)
-            return Response(
-                {
-                    "Count Of Comments": comments.count(),
-                    "Comments": serializer.data,
-                },
-                status=status.HTTP_200_OK,
-            )
+            return self.get_paginated_response(serializer.data)
         return Response(
             {"msg": "No Comments available for this User!"},
             status=status.HTTP_404_NOT_FOUND,
@@ -254,7 +415,10 @@ class CommentCreateAPIView(CreateAPIView):
 
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save()
+            with transaction.atomic():
+                comment = serializer.save()
+                bump(Post.objects.filter(pk=comment.post_id),
+                     comments_count=1)
             return Response(
                 {"msg": "Comment Created Successfully!"},
                 status=status.HTTP_201_CREATED,
@@ -262,6 +426,20 @@ class CommentCreateAPIView(CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CommentBulkCreateAPIView(BulkCreateAPIView):
+    """
+    This view will create many comments in one request
+    """
+
+    serializer_class = CommentBulkSerializer
+
+    def after_bulk_create(self, comments):
+        # bulk_create sends no signals, so drop cached posts here.
+        for post_id, total in count_by(comments, "post_id").items():
+            bump(Post.objects.filter(pk=post_id), comments_count=total)
+            transaction.on_commit(partial(post_cache.invalidate, post_id))
+
+
 class CommentDeleteAPIView(DestroyAPIView):
     """
     This view will delete the comment based on a given id
@@ -276,7 +454,10 @@ class CommentDeleteAPIView(DestroyAPIView):
         comment = self.get_object()
 
         if comment:
-            comment.delete()
+            with transaction.atomic():
+                comment.delete()
+                bump(Post.objects.filter(pk=comment.post_id),
+                     comments_count=-1)
             return Response(
                 {"msg": "comment Deleted Successfully!"},
                 status=status.HTTP_200_OK,
@@ -326,12 +507,20 @@ class FollowersListAPIView(ListAPIView):
     queryset = Follow.objects.all()
     serializer_class = FollowersSerializer
     permission_classes = [IsAuthenticated]
+    count_mode = counts.EXACT
+
+    def get_exact_count(self):
+        return User.objects.filter(pk=self.kwargs["pk"]).values_list(
+            "followers_count", flat=True
+        ).first()
 
     def get(self, request, pk, *args, **kwargs):
-        followers = Follow.objects.filter(user_following=pk)
-        if followers:
+        followers = self.paginate_queryset(
+            Follow.objects.filter(user_following=pk).select_related("user")
+        )
+        if followers or "cursor" in request.query_params:
             serializer = self.get_serializer(followers, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self.get_paginated_response(serializer.data)
         return Response(
             {"msg": "No Followers for this User!"},
             status=status.HTTP_404_NOT_FOUND,
@@ -358,7 +547,15 @@ class FollowersCreateAPIView(CreateAPIView):
 
         serializer = self.get_serializer(data=data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                bump(User.objects.filter(pk=user.id), following_count=1)
+                bump(User.objects.filter(pk=user_following.id),
+                     followers_count=1)
+                feed.backfill(user, user_following)
+                transaction.on_commit(
+                    lambda: follow_graph.add(user.id, user_following.id)
+                )
             return Response(
                 {"msg": "Follow Created Successfully!"},
                 status=status.HTTP_201_CREATED,
@@ -367,23 +564,137 @@ class FollowersCreateAPIView(CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class FollowersDeleteAPIView(DestroyAPIView):
+    """
+    This view will unfollow the user with the given id
+    """
+
+    queryset = Follow.objects.all()
+    serializer_class = FollowSerializer
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, pk, *args, **kwargs):
+        user = request.user
+
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(
+                user=user, user_following=pk
+            ).delete()
+            if deleted:
+                bump(User.objects.filter(pk=user.id), following_count=-1)
+                bump(User.objects.filter(pk=pk), followers_count=-1)
+                feed.prune(user, pk)
+                transaction.on_commit(
+                    lambda: follow_graph.remove(user.id, pk)
+                )
+
+        if deleted:
+            return Response(
+                {"msg": "Unfollowed Successfully!"},
+                status=status.HTTP_200_OK,
+            )
+        return Response(
+            {"msg": "You are not following this user."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
 class FollowingListAPIView(ListAPIView):
     queryset = Follow.objects.all()
     serializer_class = FollowingsSerializer
     # serializer_class = FollowingsSerializer
     permission_classes = [IsAuthenticated]
+    count_mode = counts.EXACT
+
+    def get_exact_count(self):
+        return User.objects.filter(pk=self.kwargs["pk"]).values_list(
+            "following_count", flat=True
+        ).first()
 
     def get(self, request, pk, *args, **kwargs):
-        following = Follow.objects.filter(user=pk)
-        if following:
+        following = self.paginate_queryset(
+            Follow.objects.filter(user=pk).select_related("user_following")
+        )
+        if following or "cursor" in request.query_params:
             serializer = self.get_serializer(following, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self.get_paginated_response(serializer.data)
         return Response(
             {"msg": "No Followings for this User!"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
 
+class FollowCountsAPIView(APIView):
+    """
+    This view will show the follower and following counts of a user
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        # The counter columns, not the follow graph: they are exact across
+        # processes, while the graph only sees this process's writes until
+        # it is rebuilt.
+        row = User.objects.filter(pk=pk).values(
+            "followers_count", "following_count"
+        ).first()
+        if row is None:
+            return Response({"errors": {"msg": "User not found!"}},
+                            status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {
+                "followers": row["followers_count"],
+                "following": row["following_count"],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class FollowCheckAPIView(APIView):
+    """
+    This view will tell whether user pk follows user other
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, other, *args, **kwargs):
+        return Response(
+            {"follows": follow_graph.follows(pk, other)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class MutualFollowsAPIView(APIView):
+    """
+    This view will show the users that follow a user and are followed back
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        mutual = follow_graph.mutual(pk)
+        return Response(
+            {"count": len(mutual), "mutual": mutual.tolist()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class FeedAPIView(ListAPIView):
+    """
+    This view will show the home timeline of the login user: posts from
+    the users they follow, newest first
+    """
+
+    serializer_class = PostGetSerializer
+    pagination_class = FeedPagination
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        posts = self.paginate_queryset(feed.sources_for(request.user))
+        serializer = self.get_serializer(posts, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
 # class LikeCreateAPIView(CreateAPIView):
 #     """
 #     This view will create the user want to like the post"""
@@ -448,13 +759,98 @@ class LikeCreateAPIView(CreateAPIView):
         # Proceed with the serialization and saving the like
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save()
+            with transaction.atomic():
+                like = serializer.save()
+                bump(Post.objects.filter(pk=like.post_id), likes_count=1)
             return Response(
                 {"msg": "Liked Successfully!"}, status=status.HTTP_201_CREATED
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class LikeBulkCreateAPIView(BulkCreateAPIView):
+    """
+    This view will create many likes in one request. Likes that already
+    exist are reported with status "exists".
+    """
+
+    serializer_class = LikeBulkSerializer
+
+    def stored_likes(self, items):
+        """The stored likes of the items' users and posts, by (user, post)."""
+        return {
+            (like.user_id, like.post_id): like
+            for like in Like.objects.filter(
+                user__in={attrs["user"] for attrs in items},
+                post__in={attrs["post"] for attrs in items},
+            ).only("uuid", "user", "post")
+        }
+
+    def bulk_create(self, serializer):
+        items = serializer.validated_data
+        stored = self.stored_likes(items)
+        keys = [(attrs["user"].pk, attrs["post"].pk) for attrs in items]
+        new = {}
+        for key, attrs in zip(keys, items):
+            if key not in stored and key not in new:
+                new[key] = Like(**attrs)
+
+        # A concurrent request may have stored some of the same likes
+        # first; ignore_conflicts drops ours, so only what was actually
+        # inserted is reported as created and counted.
+        Like.objects.bulk_create(new.values(), batch_size=500,
+                                 ignore_conflicts=True)
+        inserted = set(Like.objects.filter(
+            uuid__in=[like.pk for like in new.values()]
+        ).values_list("uuid", flat=True))
+        created = [like for like in new.values() if like.pk in inserted]
+        if len(created) < len(new):
+            stored = self.stored_likes(items)
+
+        results = []
+        reported = set()
+        for index, key in zip(serializer.valid_indices, keys):
+            like = new.get(key)
+            if like is None or like.pk not in inserted or key in reported:
+                results.append((index, stored.get(key, like), False))
+            else:
+                reported.add(key)
+                results.append((index, like, True))
+
+        for post_id, total in count_by(created, "post_id").items():
+            bump(Post.objects.filter(pk=post_id), likes_count=total)
+            transaction.on_commit(partial(post_cache.invalidate, post_id))
+        return results
+
+
+class LikeToggleAPIView(APIView):
+    """
+    This view will like (POST) or unlike (DELETE) the given post for the
+    login user and return the new like state and count
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk, *args, **kwargs):
+        return self.set_like(request, pk, liked=True)
+
+    def delete(self, request, pk, *args, **kwargs):
+        return self.set_like(request, pk, liked=False)
+
+    def set_like(self, request, pk, liked):
+        try:
+            count = set_like(request.user.id, pk, liked)
+        except PostNotFound:
+            return Response(
+                {"errors": {"msg": "Invalid Post Id!"}},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(
+            {"liked": liked, "count": count},
+            status=status.HTTP_200_OK,
+        )
+
+
 class LikeRetrieveAPIView(RetrieveAPIView):
     """
     This view is used to get the specified Like details
@@ -482,45 +878,95 @@ class LikeListAPIView(ListAPIView):
     queryset = Like.objects.all()
     serializer_class = LikeSerializer
     permission_classes = [IsAuthenticated]
+    count_mode = counts.EXACT
 
 
 # --------------------------------------------------------------------------------------
+def enrolled(courses):
+    """
+    Q for the students with an enrolment matching courses, a Q on the
+    enrolment table. A subquery instead of a join, so students with
+    several matching courses are not repeated and no DISTINCT is needed.
+    """
+    return Q(id__in=Student.courses.through.objects.filter(
+        courses
+    ).values("student_id"))
+
+
 #  fetch all students whose name starts with 'S'.
-class StudentByNameAPIView(APIView):
+class StudentByNameAPIView(StreamingListMixin, APIView):
     def post(self, request, *args, **kwargs):
         name_start = request.data.get('name_start', None)
         if name_start is None:
             return Response({"error": "name_start parameter is required"},
                             status=status.HTTP_400_BAD_REQUEST)
-        students = Student.objects.filter(name__startswith=name_start)
+        students = Student.objects.with_courses().filter(
+            name__startswith=name_start
+        )
+        query = search.name_prefix_query(name_start)
+        if query is not None and search.available():
+            # The index finds the candidates; startswith drops the few it
+            # matches more loosely (punctuation, accents).
+            students = students.filter(
+                id__in=RawSQL(*search.matching_ids_sql(query))
+            )
 
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_response(students, StudentSerializer)
 
 
 #  fetch all students but exclude those whose name starts with 'S'.
-class StudentsExcludingSAPIView(APIView):
+class StudentsExcludingSAPIView(StreamingListMixin, APIView):
     def post(self, request, *args, **kwargs):
         input_name = request.data.get("input_name", None)
-        letter_exclude = Student.objects.exclude(id__in=Student.objects.filter
-                                                 (name__startswith=input_name)
-                                                 .values_list('id', flat=True))
-        serializer = StudentSerializer(letter_exclude, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        query = search.name_prefix_query(input_name)
+        if query is not None and search.available():
+            letter_exclude = Student.objects.with_courses().exclude(
+                Q(id__in=RawSQL(*search.matching_ids_sql(query)))
+                & Q(name__startswith=input_name)
+            )
+        else:
+            letter_exclude = Student.objects.with_courses().exclude(
+                id__in=Student.objects.filter(name__startswith=input_name)
+                .values_list('id', flat=True)
+            )
+        return self.list_response(letter_exclude, StudentSerializer)
+
+
+class StudentSearchAPIView(ListAPIView):
+    """
+    This view will search the students by name, email, roll and course
+    names, matching the start of words, best match first
+    """
+
+    serializer_class = StudentSerializer
+    pagination_class = SearchPagination
+
+    def get(self, request, *args, **kwargs):
+        query = search.prefix_query(request.query_params.get("q"))
+        if query is None:
+            return Response({"errors": {"msg": "q parameter is required"}},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not search.available():
+            return Response(
+                {"errors": {"msg": "Student search is not available!"}},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        students = self.paginate_queryset(query)
+        serializer = self.get_serializer(students, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 # fetch all students who email is exactly 'so@gmail.com'.
-class StudentByEmailAPIView(APIView):
+class StudentByEmailAPIView(StreamingListMixin, APIView):
 
     def get(self, request, *args, **kwargs):
         email_is = request.query_params.get('email_is', 'so@gmail.com')
-        students = Student.objects.filter(email=email_is)
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        students = Student.objects.with_courses().filter(email=email_is)
+        return self.list_response(students, StudentSerializer)
 
 
 # fetch all students who are learning from teacher named Neha.
-class StudentLearnByTeacherAPIView(APIView):
+class StudentLearnByTeacherAPIView(StreamingListMixin, APIView):
 
     def post(self, request, *args, **kwargs):
         teacher_name = request.data.get('teacher_name', None)
@@ -528,22 +974,30 @@ class StudentLearnByTeacherAPIView(APIView):
             return Response({"error": "teacher_name is required"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        students = Student.objects.filter(courses__teacher__name=teacher_name)
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        students = Student.objects.with_courses().filter(
+            enrolled(Q(course__teacher__name=teacher_name))
+        )
+        return self.list_response(students, StudentSerializer)
 
 
 # write a query to print the total no. of students in the database.
 class TotalStudentsAPIView(APIView):
 
     def get(self, request, *args, **kwargs):
-        total_students = Student.objects.count()
-        return Response({"total_students": total_students}, 
+        mode = request.query_params.get("mode", counts.EXACT)
+        if mode not in counts.MODES:
+            return Response(
+                {"errors": {"msg": "mode must be one of "
+                                   + ", ".join(counts.MODES)}},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        total_students = counts.count(Student.objects.all(), mode)
+        return Response({"total_students": total_students},
                         status=status.HTTP_200_OK)
 
 
 #  all students who are enrolled in Python subject.
-class StudentEnrolledSubjectAPIView(APIView):
+class StudentEnrolledSubjectAPIView(StreamingListMixin, APIView):
 
     def post(self, request, *args, **kwargs):
         enrolled_sub = request.data.get('enrolled_sub', None)
@@ -551,9 +1005,11 @@ class StudentEnrolledSubjectAPIView(APIView):
             return Response({"error": "enrolled_sub is required"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        students = Student.objects.filter(courses__subject=enrolled_sub)
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Courses are named after their subject.
+        students = Student.objects.with_courses().filter(
+            enrolled(Q(course__name=enrolled_sub))
+        )
+        return self.list_response(students, StudentSerializer)
 # --------------------------------------------------------------------------
 #  1. fetch all students whose name starts with 'ab'.
 # 2. fetch all students who email is exactly 'abc@gmail.com'.
@@ -568,41 +1024,32 @@ class StudentEnrolledSubjectAPIView(APIView):
 # 9. write a query to print the total no. of students in the database.
 
 
-class StudentFilterAPIView(APIView):
-
-    def get(self, request, *args, **kwargs):
-        # fetch all students whose name starts with 'So'
-        students_name_So = Student.objects.filter(name__startswith='So')
-
-        # fetch all students but exclude those whose name starts with 'S'.
-        students_name_not_S = Student.objects.exclude(name__startswith='S')
-
-        # fetch all students who email is exactly 'so@gmail.com'.
-        students_email_exact = Student.objects.filter(email='so@gmail.com')
-
-        # fetch all students who are learning from teacher named Neha.
-        students_teacher_neha = Student.objects.filter(courses__teacher__name='Neha')
-
-        #  all students who are enrolled in Python subject.
-        students_enrolled_python = Student.objects.filter(courses__name='Python')
-
-        #  find all courses which are taught by teacher named Poja.
-        student_teacher_poja = Student.objects.filter(courses__teacher__name='Poja')
-
-        # write a query to print the total no. of students in the database.
-        # total_students = Student.objects.all().count()
-
-        # write a query to print student name in all courses without hitting
-# (n+1 queries).
-        students = Student.objects.prefetch_related('courses')
-        for student in students:
-            print(f"Student: {student.name}")
-            for course in student.courses.all():
-                print(f"  Course: {course.name}")
-
-        combined_queryset = students_name_So | students_name_not_S | students_email_exact | students_teacher_neha | students_enrolled_python | student_teacher_poja
+class StudentFilterAPIView(StreamingListMixin, APIView):
+    """
+    This view will show the students matching any of the filters below.
+    Each one can be set from the query string; the defaults are the
+    original exercise values
+    """
 
-        students = combined_queryset.distinct()
-        serializer = StudentSerializer(students, many=True)
+    def get_filter(self, params):
+        courses = Q(course__name__in=params.getlist("course") or ["Python"])
+        courses |= Q(course__teacher__name__in=(
+            params.getlist("teacher") or ["Neha", "Poja"]
+        ))
+        return (
+            # fetch all students whose name starts with 'So'
+            Q(name__startswith=params.get("name_start", "So"))
+            # fetch all students but exclude those whose name starts with
+            # 'S'.
+            | ~Q(name__startswith=params.get("exclude_start", "S"))
+            # fetch all students who email is exactly 'so@gmail.com'.
+            | Q(email=params.get("email", "so@gmail.com"))
+            # students enrolled in Python, or learning from Neha or Poja.
+            | enrolled(courses)
+        )
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    def get(self, request, *args, **kwargs):
+        students = Student.objects.with_courses().filter(
+            self.get_filter(request.query_params)
+        ).order_by("id")
+        return self.list_response(students, StudentSerializer)
\ No newline at end of file